@@ -3,19 +3,27 @@
 # ============================================================
 import time
 import sys
+from story_engine import compile_story, Session
+from story_pack import PackedStory
+from typewriter import Typewriter
+import adventure_save
 
 
 # ============================================================
 # FUNCTION DEFINITIONS
 # ============================================================
 
+# Types passages a few characters at a time (any key skips to the end of
+# the passage); prints them at once when output isn't a terminal
+typewriter = Typewriter()
+
+
 def print_slow(text, delay=0.03):
-    """Print text with typing effect for immersion"""
-    for char in text:
-        sys.stdout.write(char)
-        sys.stdout.flush()
-        time.sleep(delay)
-    print()
+    """Print text with typing effect for immersion (delay = seconds per character, 0 = all at once)"""
+    if delay <= 0:
+        print(text)
+        return
+    typewriter.write(text, cps=1.0 / delay)
 
 
 def print_separator():
@@ -32,11 +40,16 @@ def get_choice(options):
         validated user choice as string
     """
     while True:
-        choice = input("\nWhat do you do? ").strip()
+        choice = input(CHOICE_PROMPT).strip()
         if choice in options:
             return choice
         else:
-            print(f"Please pick 1 or 2!")
+            print(pick_again_message(options))
+
+
+def pick_again_message(options):
+    """What to say after an invalid choice, e.g. 'Please pick 1 or 2!'"""
+    return f"Please pick {', '.join(options[:-1])} or {options[-1]}!"
 
 
 def game_over(message, success=False):
@@ -47,14 +60,11 @@ def game_over(message, success=False):
         success: whether player won (True) or lost (False)
     """
     print_separator()
-    if success:
-        print_slow("🎉 THE END - YOU WIN! 🎉")
-    else:
-        print_slow("💙 THE END - TRY AGAIN! 💙")
+    print_slow(WIN_BANNER if success else TRY_AGAIN_BANNER)
     print()
     print_slow(message)
     print_separator()
-    print_slow("Thanks for playing!")
+    print_slow(GOODBYE)
     sys.exit()
 
 
@@ -62,9 +72,25 @@ def game_over(message, success=False):
 # GAME VARIABLES
 # ============================================================
 
-# Player info
-player_name = ""
-friends_made = 0
+# Progress is saved here after every choice, so a dropped terminal can
+# pick up where it left off (None = don't save)
+SAVE_FILE = "adventure_save.dat"
+
+# Play a compiled story pack (see story_pack.py) instead of STORY below
+STORY_PACK = None
+
+# Text around the story, shared with adventure_server.py
+TITLE = "🐠 THE LITTLE FISH'S BIG ADVENTURE 🐠"
+NAME_PROMPT = "What is your fish's name? "
+DEFAULT_NAME = "Bubbles"
+INTRO = [
+    "\nHello {player_name}! You are a small, colorful fish.",
+    "Today is your first day exploring the big ocean all by yourself!",
+]
+CHOICE_PROMPT = "\nWhat do you do? "
+WIN_BANNER = "🎉 THE END - YOU WIN! 🎉"
+TRY_AGAIN_BANNER = "💙 THE END - TRY AGAIN! 💙"
+GOODBYE = "Thanks for playing!"
 
 # Character names
 dolphin_name = "Splash"
@@ -74,29 +100,27 @@ shark_name = "Finn"
 
 
 # ============================================================
-# GAME START
-# ============================================================
-
-print_separator()
-print_slow("🐠 THE LITTLE FISH'S BIG ADVENTURE 🐠", delay=0.05)
-print_separator()
-
-# Get player name
-player_name = input("What is your fish's name? ").strip()
-if not player_name:
-    player_name = "Bubbles"
-
-print_slow(f"\nHello {player_name}! You are a small, colorful fish.")
-print_slow("Today is your first day exploring the big ocean all by yourself!")
-time.sleep(1)
-
-
-# ============================================================
-# CHOICE 1: WHO TO ASK FOR HELP
+# THE STORY
 # ============================================================
-
-print_separator()
-print_slow(f"""
+# Each node is one passage. A node either offers choices (label, next
+# node) or is an ending; 'effects' change the story variables when the
+# player arrives there (see story_engine.py).
+
+STORY = {
+    'start': 'choice_1',
+    'constants': {
+        'dolphin_name': dolphin_name,
+        'turtle_name': turtle_name,
+        'octopus_name': octopus_name,
+        'shark_name': shark_name,
+    },
+    'variables': {'friends_made': 0},
+    'nodes': {
+
+        # ---------------- CHOICE 1: WHO TO ASK FOR HELP ---------------- #
+
+        'choice_1': {
+            'text': """
 You swim away from your coral home, excited to explore!
 But soon you realize... the ocean is HUGE! You're not sure
 which way to go.
@@ -104,207 +128,178 @@ which way to go.
 Up ahead you see two of your neighbors:
 - {dolphin_name} the friendly dolphin is jumping and playing
 - {turtle_name} the wise old sea turtle is swimming slowly
-""")
-
-print_separator()
-print("1. Swim up to ask Splash the dolphin for help")
-print("2. Swim over to ask Shelly the turtle for help")
-
-choice_1 = get_choice(["1", "2"])
-
-
-# ============================================================
-# PATH A: DOLPHIN FRIEND
-# ============================================================
-
-if choice_1 == "1":
-    friends_made += 1
-    print_separator()
-    print_slow(f"""
+""",
+            'choices': [
+                ("Swim up to ask {dolphin_name} the dolphin for help", 'dolphin'),
+                ("Swim over to ask {turtle_name} the turtle for help", 'turtle'),
+            ],
+        },
+
+        # ---------------- PATH A: DOLPHIN FRIEND ---------------- #
+
+        'dolphin': {
+            'effects': {'friends_made': 1},
+            'text': """
 You swim up to {dolphin_name}.
 
 '{player_name}!' she clicks happily. 'Want to come play with me?
 I know two fun places! There's a cave with glowing jellyfish,
 or we could visit my friend {octopus_name} the octopus!'
-""")
-    
-    # ============================================================
-    # CHOICE 2A: WHERE TO GO WITH DOLPHIN
-    # ============================================================
-    
-    print_separator()
-    print("1. Go see the glowing jellyfish cave")
-    print("2. Go meet Inky the octopus")
-    
-    choice_2a = get_choice(["1", "2"])
-    
-    if choice_2a == "1":
-        print_separator()
-        print_slow(f"""
+""",
+            'choices': [
+                ("Go see the glowing jellyfish cave", 'jellyfish_cave'),
+                ("Go meet {octopus_name} the octopus", 'octopus'),
+            ],
+        },
+
+        'jellyfish_cave': {
+            'text': """
 {dolphin_name} leads you to a beautiful cave. Inside, hundreds of
 jellyfish glow like little lanterns - pink, blue, and green!
 
 'They're moon jellies,' {dolphin_name} explains. 'They won't sting
 you! Want to swim through them, or just watch from here?'
-""")
-        
-        # ============================================================
-        # CHOICE 3A: JELLYFISH DECISION
-        # ============================================================
-        
-        print_separator()
-        print("1. Swim through the glowing jellyfish")
-        print("2. Stay safe and just watch them")
-        
-        choice_3a = get_choice(["1", "2"])
-        
-        if choice_3a == "1":
-            # Good ending - brave
-            friends_made += 1
-            game_over(
-                f"{dolphin_name} was right! The jellyfish are gentle and friendly.\n"
-                f"You swim through them and they glow even brighter around you!\n"
-                f"It's the most beautiful thing you've ever seen.\n\n"
-                f"The jellyfish crown you 'Bravest Little Fish' and now you\n"
-                f"have magical friends who will light your way forever!\n\n"
-                f"You made {friends_made} new friends today!",
-                success=True
-            )
-        else:
-            # Okay ending - safe choice
-            game_over(
-                f"You watch the beautiful jellyfish dance and glow.\n"
-                f"{dolphin_name} swims through them to show you a cool trick.\n\n"
-                f"It's pretty, but you wonder what it would have felt like\n"
-                f"to swim with them. Maybe next time you'll be braver!\n\n"
-                f"You made {friends_made} new friend today!",
-                success=False
-            )
-    
-    else:  # choice_2a == "2"
-        friends_made += 1
-        print_separator()
-        print_slow(f"""
+""",
+            'choices': [
+                ("Swim through the glowing jellyfish", 'jellyfish_swim'),
+                ("Stay safe and just watch them", 'jellyfish_watch'),
+            ],
+        },
+
+        # Good ending - brave
+        'jellyfish_swim': {
+            'effects': {'friends_made': 1},
+            'ending': True,
+            'text': (
+                "{dolphin_name} was right! The jellyfish are gentle and friendly.\n"
+                "You swim through them and they glow even brighter around you!\n"
+                "It's the most beautiful thing you've ever seen.\n\n"
+                "The jellyfish crown you 'Bravest Little Fish' and now you\n"
+                "have magical friends who will light your way forever!\n\n"
+                "You made {friends_made} new friends today!"
+            ),
+        },
+
+        # Okay ending - safe choice
+        'jellyfish_watch': {
+            'ending': False,
+            'text': (
+                "You watch the beautiful jellyfish dance and glow.\n"
+                "{dolphin_name} swims through them to show you a cool trick.\n\n"
+                "It's pretty, but you wonder what it would have felt like\n"
+                "to swim with them. Maybe next time you'll be braver!\n\n"
+                "You made {friends_made} new friend today!"
+            ),
+        },
+
+        'octopus': {
+            'effects': {'friends_made': 1},
+            'text': """
 You and {dolphin_name} swim to a rocky area. {octopus_name} pops out
 from behind a rock!
 
 'Hello!' he says, changing colors from red to purple to blue.
 'I'm practicing my color changing. Want to play hide and seek?
 Or would you rather hear a story about the old shipwreck?'
-""")
-        
-        # ============================================================
-        # CHOICE 3B: OCTOPUS ACTIVITY
-        # ============================================================
-        
-        print_separator()
-        print("1. Play hide and seek with Inky")
-        print("2. Listen to the shipwreck story")
-        
-        choice_3b = get_choice(["1", "2"])
-        
-        if choice_3b == "1":
-            # Good ending - playful
-            friends_made += 1
-            game_over(
-                f"You play hide and seek! {octopus_name} is SO good at hiding\n"
-                f"because he can change colors and squeeze into tiny spaces.\n\n"
-                f"But you find the BEST hiding spot inside a giant clam shell!\n"
-                f"Everyone agrees you won the game.\n\n"
-                f"{octopus_name} and {dolphin_name} want to play with you every day!\n\n"
-                f"You made {friends_made} new friends today!",
-                success=True
-            )
-        else:
-            # Good ending - curious
-            friends_made += 1
-            game_over(
-                f"{octopus_name} tells an amazing story about a sunken pirate ship\n"
-                f"full of treasure! He shows you a shiny coin he found there.\n\n"
-                f"'Maybe tomorrow we can all go explore it together!' he says.\n\n"
-                f"{dolphin_name} and {octopus_name} are excited to have a new friend\n"
-                f"who loves adventures!\n\n"
-                f"You made {friends_made} new friends today!",
-                success=True
-            )
-
-
-# ============================================================
-# PATH B: TURTLE FRIEND  
-# ============================================================
-
-else:  # choice_1 == "2"
-    friends_made += 1
-    print_separator()
-    print_slow(f"""
+""",
+            'choices': [
+                ("Play hide and seek with {octopus_name}", 'hide_and_seek'),
+                ("Listen to the shipwreck story", 'shipwreck_story'),
+            ],
+        },
+
+        # Good ending - playful
+        'hide_and_seek': {
+            'effects': {'friends_made': 1},
+            'ending': True,
+            'text': (
+                "You play hide and seek! {octopus_name} is SO good at hiding\n"
+                "because he can change colors and squeeze into tiny spaces.\n\n"
+                "But you find the BEST hiding spot inside a giant clam shell!\n"
+                "Everyone agrees you won the game.\n\n"
+                "{octopus_name} and {dolphin_name} want to play with you every day!\n\n"
+                "You made {friends_made} new friends today!"
+            ),
+        },
+
+        # Good ending - curious
+        'shipwreck_story': {
+            'effects': {'friends_made': 1},
+            'ending': True,
+            'text': (
+                "{octopus_name} tells an amazing story about a sunken pirate ship\n"
+                "full of treasure! He shows you a shiny coin he found there.\n\n"
+                "'Maybe tomorrow we can all go explore it together!' he says.\n\n"
+                "{dolphin_name} and {octopus_name} are excited to have a new friend\n"
+                "who loves adventures!\n\n"
+                "You made {friends_made} new friends today!"
+            ),
+        },
+
+        # ---------------- PATH B: TURTLE FRIEND ---------------- #
+
+        'turtle': {
+            'effects': {'friends_made': 1},
+            'text': """
 You swim over to {turtle_name}.
 
 'Ah, young {player_name},' she says in a slow, kind voice.
 'First time out alone? I remember my first adventure!
 I can show you the peaceful kelp forest, or if you're brave,
 I know where {shark_name} the shark lives. He's actually very nice!'
-""")
-    
-    # ============================================================
-    # CHOICE 2B: WHERE TO GO WITH TURTLE
-    # ============================================================
-    
-    print_separator()
-    print("1. Visit the peaceful kelp forest")
-    print("2. Go meet Finn the shark (sounds scary!)")
-    
-    choice_2b = get_choice(["1", "2"])
-    
-    if choice_2b == "1":
-        print_separator()
-        print_slow(f"""
+""",
+            'choices': [
+                ("Visit the peaceful kelp forest", 'kelp_forest'),
+                ("Go meet {shark_name} the shark (sounds scary!)", 'shark'),
+            ],
+        },
+
+        'kelp_forest': {
+            'text': """
 {turtle_name} takes you to a tall underwater forest made of kelp.
 Sea horses float by, and you see otters playing above you!
 
 'This is my favorite place,' {turtle_name} says. 'So peaceful.
 Would you like to rest here with me, or explore deeper into
 the forest?'
-""")
-        
-        # ============================================================
-        # CHOICE 3C: KELP FOREST DECISION
-        # ============================================================
-        
-        print_separator()
-        print("1. Rest peacefully with Shelly")
-        print("2. Explore deeper into the kelp forest")
-        
-        choice_3c = get_choice(["1", "2"])
-        
-        if choice_3c == "1":
-            # Good ending - peaceful
-            game_over(
-                f"You rest in the kelp forest with {turtle_name}.\n"
-                f"She tells you stories about the ocean and teaches you\n"
-                f"about all the creatures that live here.\n\n"
-                f"You learn so much! A family of sea horses even lets\n"
-                f"you watch their babies hatch!\n\n"
-                f"Sometimes the best adventures are quiet ones.\n\n"
-                f"You made {friends_made} new friend today!",
-                success=True
-            )
-        else:
-            # Okay ending - got lost
-            game_over(
-                f"You swim deeper into the kelp forest, but it's like a maze!\n"
-                f"You get a little lost and can't find {turtle_name}.\n\n"
-                f"Luckily, a friendly sea otter helps you find your way back.\n"
-                f"{turtle_name} is waiting for you.\n\n"
-                f"'Always stay close to your friends in new places,' she\n"
-                f"advises gently. You learned an important lesson!\n\n"
-                f"You made {friends_made} new friend today.",
-                success=False
-            )
-    
-    else:  # choice_2b == "2"
-        friends_made += 1
-        print_separator()
-        print_slow(f"""
+""",
+            'choices': [
+                ("Rest peacefully with {turtle_name}", 'kelp_rest'),
+                ("Explore deeper into the kelp forest", 'kelp_explore'),
+            ],
+        },
+
+        # Good ending - peaceful
+        'kelp_rest': {
+            'ending': True,
+            'text': (
+                "You rest in the kelp forest with {turtle_name}.\n"
+                "She tells you stories about the ocean and teaches you\n"
+                "about all the creatures that live here.\n\n"
+                "You learn so much! A family of sea horses even lets\n"
+                "you watch their babies hatch!\n\n"
+                "Sometimes the best adventures are quiet ones.\n\n"
+                "You made {friends_made} new friend today!"
+            ),
+        },
+
+        # Okay ending - got lost
+        'kelp_explore': {
+            'ending': False,
+            'text': (
+                "You swim deeper into the kelp forest, but it's like a maze!\n"
+                "You get a little lost and can't find {turtle_name}.\n\n"
+                "Luckily, a friendly sea otter helps you find your way back.\n"
+                "{turtle_name} is waiting for you.\n\n"
+                "'Always stay close to your friends in new places,' she\n"
+                "advises gently. You learned an important lesson!\n\n"
+                "You made {friends_made} new friend today."
+            ),
+        },
+
+        'shark': {
+            'effects': {'friends_made': 1},
+            'text': """
 {turtle_name} takes you to a deep part of the reef. A big shark
 swims toward you! You're scared, but {turtle_name} stays calm.
 
@@ -315,41 +310,109 @@ Who's your little friend? I was just about to eat lunch. Want
 to join me? I caught some yummy fish!'
 
 Wait... eat FISH? You're a fish!
-""")
-        
-        # ============================================================
-        # CHOICE 3D: SHARK DECISION
-        # ============================================================
-        
+""",
+            'choices': [
+                ("Trust {turtle_name} and stay for lunch", 'shark_lunch'),
+                ("Say 'no thank you' and swim away fast", 'shark_run'),
+            ],
+        },
+
+        # Good ending - trust
+        'shark_lunch': {
+            'effects': {'friends_made': 1},
+            'ending': True,
+            'text': (
+                "{turtle_name} laughs. 'Don't worry, {player_name}! {shark_name}\n"
+                "only eats tuna fish from the deep ocean, not little reef fish!'\n\n"
+                "{shark_name} nods. 'That's right! I would never eat a friend.\n"
+                "Come on, I have some tasty seaweed too!'\n\n"
+                "You have lunch with a SHARK! All your friends back home\n"
+                "will be so impressed. You learned that even scary-looking\n"
+                "creatures can be kind friends.\n\n"
+                "You made {friends_made} new friends today!"
+            ),
+        },
+
+        # Bad ending - ran away
+        'shark_run': {
+            'ending': False,
+            'text': (
+                "You swim away as fast as you can!\n\n"
+                "Later, {turtle_name} finds you. 'Oh {player_name}, {shark_name}\n"
+                "wouldn't hurt you! He only eats big tuna fish. You missed\n"
+                "a chance to make a wonderful friend.'\n\n"
+                "You feel a little silly. Maybe you should have trusted\n"
+                "{turtle_name}. She's very wise.\n\n"
+                "You made {friends_made} new friend, but missed meeting another."
+            ),
+        },
+    },
+}
+
+
+# ============================================================
+# STORY INTERPRETER
+# ============================================================
+
+def play(session, save_file=None):
+    """
+    Show passages and ask for choices until the session reaches an ending
+    Args:
+        session: story_engine.Session to play
+        save_file: where to save after each choice (None = don't save)
+    """
+    while True:
+        options = session.options()
+        if session.ending is not None or not options:
+            # A finished adventure has nothing to resume
+            if save_file is not None:
+                adventure_save.delete(save_file)
+            # A node with nothing to choose counts as a try-again ending
+            game_over(session.passage(), success=bool(session.ending))
+
         print_separator()
-        print("1. Trust Shelly and stay for lunch")
-        print("2. Say 'no thank you' and swim away fast")
-        
-        choice_3d = get_choice(["1", "2"])
-        
-        if choice_3d == "1":
-            # Good ending - trust
-            friends_made += 1
-            game_over(
-                f"{turtle_name} laughs. 'Don't worry, {player_name}! {shark_name}\n"
-                f"only eats tuna fish from the deep ocean, not little reef fish!'\n\n"
-                f"{shark_name} nods. 'That's right! I would never eat a friend.\n"
-                f"Come on, I have some tasty seaweed too!'\n\n"
-                f"You have lunch with a SHARK! All your friends back home\n"
-                f"will be so impressed. You learned that even scary-looking\n"
-                f"creatures can be kind friends.\n\n"
-                f"You made {friends_made} new friends today!",
-                success=True
-            )
-        else:
-            # Bad ending - ran away
-            game_over(
-                f"You swim away as fast as you can!\n\n"
-                f"Later, {turtle_name} finds you. 'Oh {player_name}, {shark_name}\n"
-                f"wouldn't hurt you! He only eats big tuna fish. You missed\n"
-                f"a chance to make a wonderful friend.'\n\n"
-                f"You feel a little silly. Maybe you should have trusted\n"
-                f"{turtle_name}. She's very wise.\n\n"
-                f"You made {friends_made} new friend, but missed meeting another.",
-                success=False
-            )
\ No newline at end of file
+        print_slow(session.passage())
+
+        print_separator()
+        for number, label in enumerate(options, 1):
+            print(f"{number}. {label}")
+
+        choice = get_choice([str(number) for number in range(1, len(options) + 1)])
+        session.choose(int(choice))
+        if save_file is not None:
+            adventure_save.save(session, save_file)
+
+
+# ============================================================
+# GAME START
+# ============================================================
+
+def main():
+    story = PackedStory(STORY_PACK) if STORY_PACK is not None else compile_story(STORY)
+
+    print_separator()
+    print_slow(TITLE, delay=0.05)
+    print_separator()
+
+    # Offer to carry on from the last save
+    saved = adventure_save.load(story, SAVE_FILE) if SAVE_FILE is not None else None
+    if saved is not None:
+        answer = input(f"Continue {saved.player_name}'s adventure where you left off? (y/n) ").strip().lower()
+        if answer in ("", "y", "yes"):
+            play(saved, SAVE_FILE)
+        adventure_save.delete(SAVE_FILE)
+
+    # Get player name
+    player_name = input(NAME_PROMPT).strip()
+    if not player_name:
+        player_name = DEFAULT_NAME
+
+    for line in INTRO:
+        print_slow(line.format(player_name=player_name))
+    time.sleep(1)
+
+    play(Session(story, player_name), SAVE_FILE)
+
+
+if __name__ == "__main__":
+    main()
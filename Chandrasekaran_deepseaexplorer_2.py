@@ -1,14 +1,23 @@
 import pygame
 import random
 import math
+from entity_store import EntityTable, ObjectPool
+from sprite_cache import sprite_cache
+from text_cache import text_cache
+from dirty_rects import DirtyRectPresenter
+from game_clock import FixedTimestep
+from replay import Recording, save_replay
+from frame_profiler import FrameProfiler
+from achievements import AchievementEngine
+from profile_store import ProfileStore
 
-# Initialize Pygame
+# Initialize Pygame (the window itself is only opened in main(), so the
+# simulation core below can be imported and run without a display)
 pygame.init()
 
 # Screen dimensions
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("🌊 Deep Sea Explorer - Ethical Edition v3.3")
+CAPTION = "🌊 Deep Sea Explorer - Ethical Edition v3.3"
 
 # Colors
 DARK_BLUE = (10, 20, 50)
@@ -23,6 +32,13 @@ GRAY = (100, 100, 100)
 
 # Game settings
 FPS = 60
+STEP_RATE = 60  # game logic steps per second (independent of how fast frames are drawn)
+REPLAY_FILE = "last_run_v2.dsr"  # each finished run is saved here (None = don't save)
+PLAYER_PROFILE = "player_v2"  # high score, achievements and play time are kept here (None = don't save)
+PROFILE_FILE = "frame_profile_v2.csv"  # F3 profiler timings are written here on exit
+PROFILE_PHASES = ['events', 'submarine', 'spawn', 'collectibles', 'obstacles', 'achievements',
+                  'draw', 'hud', 'overlays', 'flip']
+USE_DIRTY_RECTS = True  # push only changed screen regions instead of flipping every frame
 GRAVITY = 0.3
 JUMP_STRENGTH = -6
 
@@ -33,18 +49,31 @@ MAX_SPEED = 15
 BASE_SPAWN_RATE = 0.02
 SPAWN_MULTIPLIER = 1.015
 
+# Spawn governor: the spawn curve above is uncapped, so late in a run the
+# number of live entities (and the frame time) is kept in check here
+SPAWN_ENTITY_BUDGET = 80  # most collectibles + obstacles alive at once
+SPAWN_MAX_PENDING = 20  # deferred spawns kept per kind; more than that are dropped
+SPAWN_FRAME_TIME_TARGET = None  # seconds; set to also shrink the budget on slow frames
+                                # (this makes runs depend on the machine, so replays may differ)
+
 # ETHICAL FEATURE 1: Fatigue System (Negative Disengagement)
 FATIGUE_THRESHOLD = 90  # seconds before fatigue warnings
 FATIGUE_SEVERE = 180  # seconds before severe effects
 EYE_STRAIN_BLINK_INTERVAL = 120  # Remind to blink every 2 minutes
 
 # ETHICAL FEATURE 2: Skill Progression & Achievements (Positive Engagement)
+# Each achievement unlocks once its metric reaches the threshold (see achievements.py)
 ACHIEVEMENTS = {
-    'first_treasure': {'name': 'First Treasure!', 'desc': 'Collected your first treasure chest', 'unlocked': False},
-    'survivor_30': {'name': '30 Second Survivor', 'desc': 'Survived for 30 seconds', 'unlocked': False},
-    'survivor_60': {'name': 'Deep Sea Veteran', 'desc': 'Survived for 60 seconds', 'unlocked': False},
-    'score_100': {'name': 'Century Collector', 'desc': 'Reached 100 points', 'unlocked': False},
-    'score_500': {'name': 'Ocean Master', 'desc': 'Reached 500 points', 'unlocked': False},
+    'first_treasure': {'name': 'First Treasure!', 'desc': 'Collected your first treasure chest',
+                       'metric': 'treasures', 'threshold': 1},
+    'survivor_30': {'name': '30 Second Survivor', 'desc': 'Survived for 30 seconds',
+                    'metric': 'time', 'threshold': 30},
+    'survivor_60': {'name': 'Deep Sea Veteran', 'desc': 'Survived for 60 seconds',
+                    'metric': 'time', 'threshold': 60},
+    'score_100': {'name': 'Century Collector', 'desc': 'Reached 100 points',
+                  'metric': 'score', 'threshold': 100},
+    'score_500': {'name': 'Ocean Master', 'desc': 'Reached 500 points',
+                  'metric': 'score', 'threshold': 500},
 }
 
 # Fonts
@@ -53,8 +82,17 @@ font_medium = pygame.font.Font(None, 36)
 font_small = pygame.font.Font(None, 24)
 font_tiny = pygame.font.Font(None, 18)
 
+# Entity classes use __slots__ and keep one Rect each, updated in place by
+# get_rect(), so collision checks don't allocate
+
 class Submarine:
+    __slots__ = ('x', 'y', 'velocity', 'width', 'height', 'rect')
+    
     def __init__(self):
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset()
+    
+    def reset(self):
         self.x = 100
         self.y = HEIGHT // 2
         self.velocity = 0
@@ -81,10 +119,17 @@ class Submarine:
         pygame.draw.rect(surface, ORANGE, (self.x + 50, self.y + 10, 15, 10))
     
     def get_rect(self):
-        return pygame.Rect(self.x, self.y, self.width, self.height)
+        self.rect.update(self.x, self.y, self.width, self.height)
+        return self.rect
 
 class Collectible:
+    __slots__ = ('x', 'y', 'type', 'collected', 'value', 'color', 'size', 'rect')
+    
     def __init__(self, x, y, type_):
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(x, y, type_)
+    
+    def reset(self, x, y, type_):
         self.x = x
         self.y = y
         self.type = type_
@@ -113,11 +158,18 @@ class Collectible:
                 pygame.draw.rect(surface, YELLOW, (self.x - 10, self.y - 5, 20, 10))
     
     def get_rect(self):
-        return pygame.Rect(self.x - self.size, self.y - self.size, 
-                          self.size * 2, self.size * 2)
+        self.rect.update(self.x - self.size, self.y - self.size,
+                         self.size * 2, self.size * 2)
+        return self.rect
 
 class Obstacle:
+    __slots__ = ('x', 'y', 'type', 'color', 'size', 'rect')
+    
     def __init__(self, x, y, type_):
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(x, y, type_)
+    
+    def reset(self, x, y, type_):
         self.x = x
         self.y = y
         self.type = type_
@@ -158,8 +210,27 @@ class Obstacle:
             ])
     
     def get_rect(self):
-        return pygame.Rect(self.x - self.size, self.y - self.size,
-                          self.size * 2, self.size * 2)
+        self.rect.update(self.x - self.size, self.y - self.size,
+                         self.size * 2, self.size * 2)
+        return self.rect
+
+# Translucent layers (fatigue dimming, pause screen, achievement cards) are
+# allocated once and reused; only their alpha changes from frame to frame
+overlay_cache = {}
+
+def get_overlay(width, height, color, border_color=None):
+    """Reusable solid surface, with an optional 3px border, for translucent layers"""
+    key = (width, height, color, border_color)
+    overlay = overlay_cache.get(key)
+    if overlay is None:
+        overlay = pygame.Surface((width, height))
+        if pygame.display.get_surface() is not None:
+            overlay = overlay.convert()
+        overlay.fill(color)
+        if border_color is not None:
+            pygame.draw.rect(overlay, border_color, (0, 0, width, height), 3)
+        overlay_cache[key] = overlay
+    return overlay
 
 # ETHICAL FEATURE FUNCTIONS
 
@@ -208,35 +279,6 @@ def apply_fatigue_effects(submarine, fatigue_level):
     
     return effects
 
-def check_achievements(score, time_elapsed, treasure_collected, achievements):
-    """
-    POSITIVE ENGAGEMENT FEATURE: Checks and unlocks achievements
-    Returns list of newly unlocked achievements
-    """
-    newly_unlocked = []
-    
-    if treasure_collected and not achievements['first_treasure']['unlocked']:
-        achievements['first_treasure']['unlocked'] = True
-        newly_unlocked.append('first_treasure')
-    
-    if time_elapsed >= 30 and not achievements['survivor_30']['unlocked']:
-        achievements['survivor_30']['unlocked'] = True
-        newly_unlocked.append('survivor_30')
-    
-    if time_elapsed >= 60 and not achievements['survivor_60']['unlocked']:
-        achievements['survivor_60']['unlocked'] = True
-        newly_unlocked.append('survivor_60')
-    
-    if score >= 100 and not achievements['score_100']['unlocked']:
-        achievements['score_100']['unlocked'] = True
-        newly_unlocked.append('score_100')
-    
-    if score >= 500 and not achievements['score_500']['unlocked']:
-        achievements['score_500']['unlocked'] = True
-        newly_unlocked.append('score_500')
-    
-    return newly_unlocked
-
 def calculate_skill_level(score, time_elapsed):
     """
     POSITIVE ENGAGEMENT FEATURE: Calculates player skill rating
@@ -270,31 +312,29 @@ def draw_achievement_notification(surface, achievement_key, achievements, alpha=
     notif_y = 120
     
     # Semi-transparent background
-    notif_surface = pygame.Surface((notif_width, notif_height))
+    notif_surface = get_overlay(notif_width, notif_height, (30, 30, 30), YELLOW)
     notif_surface.set_alpha(alpha)
-    notif_surface.fill((30, 30, 30))
-    pygame.draw.rect(notif_surface, YELLOW, (0, 0, notif_width, notif_height), 3)
     surface.blit(notif_surface, (notif_x, notif_y))
     
     # Achievement text
-    achievement_text = font_small.render("🏆 ACHIEVEMENT UNLOCKED!", True, YELLOW)
-    surface.blit(achievement_text, (notif_x + 10, notif_y + 10))
+    text_cache.draw(surface, font_small, "🏆 ACHIEVEMENT UNLOCKED!", YELLOW, (notif_x + 10, notif_y + 10))
+    text_cache.draw(surface, font_medium, achievement['name'], WHITE, (notif_x + 10, notif_y + 35))
     
-    name_text = font_medium.render(achievement['name'], True, WHITE)
-    surface.blit(name_text, (notif_x + 10, notif_y + 35))
+    return pygame.Rect(notif_x, notif_y, notif_width, notif_height)
 
 def draw_fatigue_overlay(surface, fatigue_level, time_elapsed):
     """
     NEGATIVE DISENGAGEMENT FEATURE: Draws fatigue warnings and visual effects
+    Returns list of regions drawn (not counting the full-screen dimming)
     """
     if fatigue_level == 'none':
-        return
+        return []
     
     # Warning message at top
     message = get_fatigue_message(fatigue_level)
     color = ORANGE if fatigue_level == 'mild' else RED
     
-    warning_text = font_small.render(message, True, color)
+    warning_text = text_cache.render(font_small, message, color)
     text_rect = warning_text.get_rect(center=(WIDTH//2, 30))
     
     # Background for text
@@ -302,18 +342,20 @@ def draw_fatigue_overlay(surface, fatigue_level, time_elapsed):
     pygame.draw.rect(surface, (0, 0, 0), bg_rect)
     pygame.draw.rect(surface, color, bg_rect, 2)
     surface.blit(warning_text, text_rect)
+    drawn = [bg_rect]
     
     # Visual blur effect for severe fatigue
     if fatigue_level in ['moderate', 'severe']:
-        overlay = pygame.Surface((WIDTH, HEIGHT))
+        overlay = get_overlay(WIDTH, HEIGHT, (0, 0, 0))
         overlay.set_alpha(30 if fatigue_level == 'moderate' else 60)
-        overlay.fill((0, 0, 0))
         surface.blit(overlay, (0, 0))
     
     # Eye strain reminder
     if int(time_elapsed) % EYE_STRAIN_BLINK_INTERVAL == 0 and time_elapsed > 0:
-        blink_text = font_small.render("👁️ Remember to blink!", True, LIGHT_BLUE)
-        surface.blit(blink_text, (WIDTH//2 - blink_text.get_width()//2, 60))
+        blink_text = text_cache.render(font_small, "👁️ Remember to blink!", LIGHT_BLUE)
+        drawn.append(surface.blit(blink_text, (WIDTH//2 - blink_text.get_width()//2, 60)))
+    
+    return drawn
 
 def calculate_difficulty(time_elapsed):
     """Calculate exponential difficulty multiplier based on time"""
@@ -328,35 +370,138 @@ def calculate_spawn_rate(time_elapsed):
     """Calculate spawn rate (exponential growth)"""
     return BASE_SPAWN_RATE * math.pow(SPAWN_MULTIPLIER, time_elapsed)
 
+class SpawnGovernor:
+    """
+    Shapes spawns so the number of live entities stays within a budget
+    
+    The game still rolls for every spawn as usual. While the screen is under
+    budget, every successful roll spawns, exactly as without the governor.
+    At the budget, a successful roll is deferred instead: it spawns on a
+    later step once there is room, so difficulty keeps rising but arrives
+    spread out. If too many are waiting, the extra ones are dropped.
+    
+    Each kind is owed a share of the budget in proportion to its spawn
+    chance. Room that a kind with deferred spawns is owed is kept for it,
+    so the kind that rolls first can't take every slot that frees up; a
+    kind that isn't being held back leaves its share free for the others.
+    Args:
+        entity_budget: most live entities allowed
+        max_pending: most deferred spawns kept per kind
+        frame_time_target: seconds per frame to aim for (None = ignore frame time)
+    """
+    def __init__(self, entity_budget=SPAWN_ENTITY_BUDGET, max_pending=SPAWN_MAX_PENDING,
+                 frame_time_target=SPAWN_FRAME_TIME_TARGET):
+        self.entity_budget = entity_budget
+        self.max_pending = max_pending
+        self.frame_time_target = frame_time_target
+        self.budget_scale = 1.0
+        self.pending = {}
+        self.chances = {}  # kind -> its latest spawn chance per step
+        
+        # Counters
+        self.requested = 0  # successful spawn rolls
+        self.deferred = 0  # rolls held back because the screen was full
+        self.released = 0  # deferred spawns that later went ahead
+        self.dropped = 0  # deferred spawns thrown away because too many were waiting
+    
+    @property
+    def shaped(self):
+        """How many spawns didn't happen on the step they were rolled"""
+        return self.deferred
+    
+    def budget(self):
+        return max(1, int(self.entity_budget * self.budget_scale))
+    
+    def share(self, kind):
+        """Part of the budget owed to a kind, in proportion to its spawn chance"""
+        total = sum(self.chances.values())
+        if total <= 0:
+            return self.budget()
+        return self.budget() * self.chances.get(kind, 0) / total
+    
+    def has_room(self, kind, live):
+        """
+        True if one more of kind fits without taking room another kind is
+        waiting for (a kind with deferred spawns is owed up to its share)
+        """
+        owed = sum(max(0, self.share(other) - count) for other, count in live.items()
+                   if other != kind and self.pending.get(other))
+        return sum(live.values()) + owed < self.budget()
+    
+    def admit(self, kind, chance, rolled, live):
+        """
+        Decide how many entities of a kind to spawn this step
+        Args:
+            kind: e.g. 'collectible' or 'obstacle' (each has its own queue)
+            chance: this step's spawn chance for the kind (may be above 1)
+            rolled: True if this step's spawn roll succeeded
+            live: dict of kind -> live entities on screen right now
+        Returns:
+            how many to spawn now: the roll's spawn if there is room, plus
+            one deferred spawn if there is still room after it
+        """
+        self.chances[kind] = chance
+        live = dict(live)
+        live.setdefault(kind, 0)
+        pending = self.pending.get(kind, 0)
+        count = 0
+        if rolled:
+            self.requested += 1
+            if self.has_room(kind, live):
+                count += 1
+                live[kind] += 1
+            else:
+                self.deferred += 1
+                if pending < self.max_pending:
+                    pending += 1
+                else:
+                    self.dropped += 1
+        if pending and self.has_room(kind, live):
+            pending -= 1
+            self.released += 1
+            count += 1
+        self.pending[kind] = pending
+        return count
+    
+    def observe_frame(self, seconds):
+        """Feed the last frame's time; shrinks the budget while frames are too slow"""
+        if self.frame_time_target is None:
+            return
+        if seconds > self.frame_time_target:
+            self.budget_scale = max(0.25, self.budget_scale * 0.95)
+        else:
+            self.budget_scale = min(1.0, self.budget_scale * 1.01)
+
 def draw_background(surface, scroll):
+    """Draw the sea and bubbles. Returns the bubbles' Rects (the only part that moves)."""
     surface.fill(DARK_BLUE)
     
+    bubbles = []
     for i in range(20):
         x = (i * 50 + scroll) % WIDTH
         y = (i * 80) % HEIGHT
-        pygame.draw.circle(surface, LIGHT_BLUE, (x, y), 5, 1)
+        bubbles.append(pygame.draw.circle(surface, LIGHT_BLUE, (x, y), 5, 1))
+    return bubbles
 
 def draw_hud(surface, score, high_score, time_elapsed, current_speed, difficulty_mult, skill_level, skill_rank):
-    """Draw HUD with score, time, difficulty, and skill level"""
+    """Draw HUD with score, time, difficulty, and skill level. Returns the Rects drawn."""
+    drawn = []
+    
     # Score
-    score_text = font_medium.render(f"Score: {score}", True, WHITE)
-    surface.blit(score_text, (10, 10))
+    drawn.append(text_cache.draw_number(surface, font_medium, "Score: ", str(score), WHITE, (10, 10)))
     
     # High score
-    high_score_text = font_small.render(f"Best: {high_score}", True, YELLOW)
-    surface.blit(high_score_text, (10, 50))
+    drawn.append(text_cache.draw_number(surface, font_small, "Best: ", str(high_score), YELLOW, (10, 50)))
     
     # Time survived
-    time_text = font_small.render(f"Time: {int(time_elapsed)}s", True, WHITE)
-    surface.blit(time_text, (10, 80))
+    drawn.append(text_cache.draw_number(surface, font_small, "Time: ", str(int(time_elapsed)), WHITE, (10, 80), "s"))
     
     # Skill level (POSITIVE ENGAGEMENT)
-    skill_text = font_small.render(f"Skill: {skill_level}", True, GREEN)
-    surface.blit(skill_text, (10, 110))
+    drawn.append(text_cache.draw(surface, font_small, f"Skill: {skill_level}", GREEN, (10, 110)))
     
     # Skill stars
     for i in range(skill_rank):
-        pygame.draw.polygon(surface, YELLOW, [
+        star = pygame.draw.polygon(surface, YELLOW, [
             (10 + i*20 + 10, 135),
             (10 + i*20 + 12, 140),
             (10 + i*20 + 18, 140),
@@ -368,15 +513,16 @@ def draw_hud(surface, score, high_score, time_elapsed, current_speed, difficulty
             (10 + i*20 + 2, 140),
             (10 + i*20 + 8, 140)
         ])
+        drawn.append(star)
     
     # Speed indicator
-    speed_text = font_small.render(f"Speed: {current_speed:.1f}x", True, ORANGE)
-    surface.blit(speed_text, (WIDTH - 150, 10))
+    drawn.append(text_cache.draw_number(surface, font_small, "Speed: ", f"{current_speed:.1f}", ORANGE,
+                                        (WIDTH - 150, 10), "x"))
     
     # Difficulty multiplier
     diff_color = RED if difficulty_mult > 3 else ORANGE if difficulty_mult > 2 else GREEN
-    diff_text = font_small.render(f"Difficulty: {difficulty_mult:.2f}x", True, diff_color)
-    surface.blit(diff_text, (WIDTH - 200, 40))
+    drawn.append(text_cache.draw_number(surface, font_small, "Difficulty: ", f"{difficulty_mult:.2f}", diff_color,
+                                        (WIDTH - 200, 40), "x"))
     
     # Difficulty bar
     bar_width = 150
@@ -386,6 +532,9 @@ def draw_hud(surface, score, high_score, time_elapsed, current_speed, difficulty
     pygame.draw.rect(surface, WHITE, (bar_x, bar_y, bar_width, bar_height), 2)
     fill_width = min(bar_width, int((difficulty_mult - 1) * bar_width / 5))
     pygame.draw.rect(surface, diff_color, (bar_x, bar_y, fill_width, bar_height))
+    drawn.append(pygame.Rect(bar_x, bar_y, bar_width, bar_height))
+    
+    return drawn
 
 def draw_start_screen(surface):
     surface.fill(DARK_BLUE)
@@ -448,7 +597,7 @@ def draw_game_over_screen(surface, score, high_score, time_survived, skill_level
         surface.blit(high_score_text, (WIDTH//2 - high_score_text.get_width()//2, 280))
     
     # Show unlocked achievements
-    unlocked_count = sum(1 for a in achievements.values() if a['unlocked'])
+    unlocked_count = achievements.unlocked_count()
     achievement_text = font_small.render(f"Achievements: {unlocked_count}/{len(achievements)}", True, YELLOW)
     surface.blit(achievement_text, (WIDTH//2 - achievement_text.get_width()//2, 320))
     
@@ -456,59 +605,236 @@ def draw_game_over_screen(surface, score, high_score, time_survived, skill_level
     surface.blit(restart, (WIDTH//2 - restart.get_width()//2, 380))
 
 def draw_pause_screen(surface, score, time_elapsed, skill_level):
-    overlay = pygame.Surface((WIDTH, HEIGHT))
+    overlay = get_overlay(WIDTH, HEIGHT, (0, 0, 0))
     overlay.set_alpha(128)
-    overlay.fill((0, 0, 0))
     surface.blit(overlay, (0, 0))
     
-    pause_text = font_large.render("PAUSED", True, WHITE)
+    pause_text = text_cache.render(font_large, "PAUSED", WHITE)
     surface.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2 - 80))
     
-    score_text = font_medium.render(f"Score: {score}", True, WHITE)
+    score_text = text_cache.render(font_medium, f"Score: {score}", WHITE)
     surface.blit(score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT//2 - 20))
     
-    time_text = font_small.render(f"Time: {int(time_elapsed)}s", True, WHITE)
+    time_text = text_cache.render(font_small, f"Time: {int(time_elapsed)}s", WHITE)
     surface.blit(time_text, (WIDTH//2 - time_text.get_width()//2, HEIGHT//2 + 20))
     
-    skill_text = font_small.render(f"Skill: {skill_level}", True, GREEN)
+    skill_text = text_cache.render(font_small, f"Skill: {skill_level}", GREEN)
     surface.blit(skill_text, (WIDTH//2 - skill_text.get_width()//2, HEIGHT//2 + 50))
     
-    health_text = font_small.render("💚 Great time for a stretch break!", True, LIGHT_BLUE)
+    health_text = text_cache.render(font_small, "💚 Great time for a stretch break!", LIGHT_BLUE)
     surface.blit(health_text, (WIDTH//2 - health_text.get_width()//2, HEIGHT//2 + 90))
     
-    continue_text = font_small.render("Press P to continue", True, WHITE)
+    continue_text = text_cache.render(font_small, "Press P to continue", WHITE)
     surface.blit(continue_text, (WIDTH//2 - continue_text.get_width()//2, HEIGHT//2 + 120))
 
+# Entity types, in the order used for the type column of the entity tables
+COLLECTIBLE_TYPES = ['pearl', 'coin', 'treasure']
+OBSTACLE_TYPES = ['mine', 'jellyfish', 'coral']
+TREASURE = COLLECTIBLE_TYPES.index('treasure')
+
+# One shared prototype per type (tables only read them, and move them into
+# place to draw)
+COLLECTIBLE_PROTOTYPES = [Collectible(0, 0, t) for t in COLLECTIBLE_TYPES]
+OBSTACLE_PROTOTYPES = [Obstacle(0, 0, t) for t in OBSTACLE_TYPES]
+
+# Free lists, so starting a run reuses the last run's submarine and entity
+# tables instead of allocating new ones
+submarine_pool = ObjectPool(Submarine)
+collectible_table_pool = ObjectPool(lambda: EntityTable(COLLECTIBLE_PROTOTYPES))
+obstacle_table_pool = ObjectPool(lambda: EntityTable(OBSTACLE_PROTOTYPES))
+
+# SIMULATION CORE
+# Everything that decides the outcome of a run lives here, with no drawing,
+# no event pump and no frame limiter, so whole games can be simulated headless.
+
+def new_achievements():
+    """Achievement engine for ACHIEVEMENTS with nothing unlocked"""
+    return AchievementEngine(ACHIEVEMENTS)
+
+class GameState:
+    """
+    Complete state of one run
+    Args:
+        seed: seed for this run's random generator (None = random)
+        high_score: best score so far, updated when the run ends
+        achievements: AchievementEngine to unlock into (shared across runs)
+        earlier_play_time: seconds already played today before this run
+            (from the player's profile); counts towards fatigue
+    """
+    def __init__(self, seed=None, high_score=0, achievements=None, earlier_play_time=0):
+        self.rng = random.Random(seed)
+        self.submarine = submarine_pool.acquire()
+        self.collectibles = collectible_table_pool.acquire()
+        self.obstacles = obstacle_table_pool.acquire()
+        self.score = 0
+        self.high_score = high_score
+        self.scroll = 0
+        self.time_elapsed = 0
+        self.frame_count = 0
+        self.treasures = 0  # treasure chests picked up this run
+        self.achievements = achievements if achievements is not None else new_achievements()
+        self.newly_unlocked = []
+        self.unlocked = []  # everything unlocked during this run
+        self.skill_level = "Beginner"
+        self.skill_rank = 0
+        self.difficulty_mult = 1
+        self.current_speed = BASE_SPEED
+        self.earlier_play_time = earlier_play_time
+        self.fatigue_level = 'none'
+        self.governor = SpawnGovernor()
+        self.game_over = False
+    
+    def release(self):
+        """Hand the submarine and entity tables back for the next run to reuse"""
+        submarine_pool.release(self.submarine)
+        collectible_table_pool.release(self.collectibles)
+        obstacle_table_pool.release(self.obstacles)
+
+def step_game(state, jump, dt, profiler=None):
+    """
+    Advance a run by one frame
+    Args:
+        state: GameState to advance
+        jump: True if SPACE/UP was pressed this frame
+        dt: seconds of game time this frame covers
+        profiler: FrameProfiler to time the phases with (optional)
+    Returns:
+        the same GameState, advanced (state.game_over is set on a crash)
+    """
+    rng = state.rng
+    submarine = state.submarine
+    
+    if jump:
+        submarine.jump()
+    
+    state.time_elapsed += dt
+    state.frame_count += 1
+    time_elapsed = state.time_elapsed
+    
+    # Calculate current difficulty
+    difficulty_mult = calculate_difficulty(time_elapsed)
+    current_speed = calculate_speed(time_elapsed)
+    current_spawn_rate = calculate_spawn_rate(time_elapsed)
+    state.difficulty_mult = difficulty_mult
+    state.current_speed = current_speed
+    
+    # Check fatigue level (over today's play, not just this run)
+    state.fatigue_level = check_fatigue_level(state.earlier_play_time + time_elapsed)
+    
+    # Update submarine
+    submarine.update()
+    if profiler:
+        profiler.mark('submarine')
+    
+    # Scroll background
+    state.scroll += current_speed
+    
+    # Spawn collectibles (through the governor, which keeps entity counts bounded)
+    governor = state.governor
+    live = {'collectible': len(state.collectibles), 'obstacle': len(state.obstacles)}
+    chance = current_spawn_rate * 0.6
+    for _ in range(governor.admit('collectible', chance, rng.random() < chance, live)):
+        y = rng.randint(50, HEIGHT - 50)
+        type_ = rng.choice(['pearl', 'pearl', 'coin', 'coin', 'coin', 'treasure'])
+        state.collectibles.spawn(WIDTH, y, COLLECTIBLE_TYPES.index(type_))
+        live['collectible'] += 1
+    
+    # Spawn obstacles
+    chance = current_spawn_rate * difficulty_mult * 0.4
+    for _ in range(governor.admit('obstacle', chance, rng.random() < chance, live)):
+        y = rng.randint(50, HEIGHT - 50)
+        type_ = rng.choice(['mine', 'jellyfish', 'coral'])
+        state.obstacles.spawn(WIDTH, y, OBSTACLE_TYPES.index(type_))
+    
+    if profiler:
+        profiler.mark('spawn')
+    
+    sub_rect = submarine.get_rect()
+    
+    # Update collectibles
+    collectibles = state.collectibles
+    collectibles.move(current_speed)
+    collectibles.cull(-50)
+    hits = collectibles.collide(sub_rect)
+    if len(hits):
+        state.score += int(collectibles.value[hits].sum())
+        state.treasures += int((collectibles.type[hits] == TREASURE).sum())
+        collectibles.kill(hits)
+    if profiler:
+        profiler.mark('collectibles')
+    
+    # Update obstacles
+    obstacles = state.obstacles
+    obstacles.move(current_speed)
+    obstacles.cull(-50)
+    if len(obstacles.collide(sub_rect)):
+        state.game_over = True
+        if state.score > state.high_score:
+            state.high_score = state.score
+    if profiler:
+        profiler.mark('obstacles')
+    
+    # Check achievements (each metric only costs a look at its next threshold)
+    engine = state.achievements
+    unlocked = engine.update('time', time_elapsed)
+    if len(hits):
+        unlocked += engine.update('score', state.score)
+        unlocked += engine.update('treasures', state.treasures)
+    state.newly_unlocked = unlocked
+    if unlocked:
+        state.unlocked.extend(unlocked)
+    
+    # Calculate skill level
+    state.skill_level, state.skill_rank = calculate_skill_level(state.score, time_elapsed)
+    if profiler:
+        profiler.mark('achievements')
+    
+    return state
+
+def simulate_game(pilot=None, seed=None, dt=1.0 / STEP_RATE, max_time=600):
+    """
+    Play one full run headless, as fast as the CPU allows
+    Args:
+        pilot: function(state) -> True to jump this frame (None = never jump)
+        seed: seed for the run's random generator
+        dt: seconds of game time per step
+        max_time: stop after this many seconds of game time even if alive
+    Returns:
+        the finished GameState
+    """
+    state = GameState(seed)
+    while not state.game_over and state.time_elapsed < max_time:
+        jump = pilot(state) if pilot is not None else False
+        step_game(state, jump, dt)
+    return state
+
 # Main game loop
 def main():
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(CAPTION)
     clock = pygame.time.Clock()
+    presenter = DirtyRectPresenter(USE_DIRTY_RECTS)
+    timestep = FixedTimestep(STEP_RATE)
+    profiler = FrameProfiler(PROFILE_PHASES)
     running = True
     
     # Game state
     state = 'start'
     
-    # Game objects
-    submarine = Submarine()
-    collectibles = []
-    obstacles = []
-    
-    # Game variables
-    score = 0
-    high_score = 0
-    scroll = 0
-    time_elapsed = 0
-    frame_count = 0
-    treasure_collected = False
-    
-    # Ethical feature tracking
-    achievements = {key: {'name': val['name'], 'desc': val['desc'], 'unlocked': False} 
-                   for key, val in ACHIEVEMENTS.items()}
+    # Ethical feature tracking (achievements stay unlocked between runs,
+    # and between sessions through the profile)
+    profile = ProfileStore(PLAYER_PROFILE)
+    high_score = profile.high_score
+    achievements = new_achievements()
+    achievements.restore(profile.achievements)
+    game = GameState(high_score=high_score, achievements=achievements)
+    recording = None
     achievement_notifications = []  # List of (achievement_key, time_shown)
-    skill_level = "Beginner"
-    skill_rank = 0
     
+    jump = False
     while running:
         dt = clock.tick(FPS) / 1000.0
+        profiler.begin_frame()
         
         # Event handling
         for event in pygame.event.get():
@@ -516,140 +842,122 @@ def main():
                 running = False
             
             if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    profiler.toggle()
+                    presenter.mark_full()
+                
                 if state == 'start':
                     if event.key in [pygame.K_SPACE, pygame.K_UP]:
                         state = 'playing'
-                        submarine = Submarine()
-                        collectibles = []
-                        obstacles = []
-                        score = 0
-                        scroll = 0
-                        time_elapsed = 0
-                        frame_count = 0
-                        treasure_collected = False
+                        seed = random.getrandbits(63)
+                        game.release()
+                        game = GameState(seed, high_score=high_score, achievements=achievements,
+                                         earlier_play_time=profile.play_time_today())
+                        recording = Recording(2, seed, STEP_RATE)
                         achievement_notifications = []
+                        timestep.reset()
+                        jump = False
                 
                 elif state == 'playing':
                     if event.key in [pygame.K_SPACE, pygame.K_UP]:
-                        submarine.jump()
+                        jump = True
                     if event.key == pygame.K_p:
                         state = 'paused'
                 
                 elif state == 'paused':
                     if event.key == pygame.K_p:
                         state = 'playing'
+                        timestep.reset()
                 
                 elif state == 'gameover':
                     if event.key == pygame.K_SPACE:
                         state = 'start'
         
-        # Game logic
+        profiler.mark('events')
+        
+        # Game logic runs in fixed steps; when frames take too long, several
+        # steps run before the next frame is drawn
         if state == 'playing':
-            time_elapsed += dt
-            frame_count += 1
-            
-            # Calculate current difficulty
-            difficulty_mult = calculate_difficulty(time_elapsed)
-            current_speed = calculate_speed(time_elapsed)
-            current_spawn_rate = calculate_spawn_rate(time_elapsed)
-            
-            # Check fatigue level
-            fatigue_level = check_fatigue_level(time_elapsed)
-            
-            # Update submarine
-            submarine.update()
-            
-            # Scroll background
-            scroll += current_speed
-            
-            # Spawn collectibles
-            if random.random() < current_spawn_rate * 0.6:
-                y = random.randint(50, HEIGHT - 50)
-                type_ = random.choice(['pearl', 'pearl', 'coin', 'coin', 'coin', 'treasure'])
-                collectibles.append(Collectible(WIDTH, y, type_))
-            
-            # Spawn obstacles
-            if random.random() < current_spawn_rate * difficulty_mult * 0.4:
-                y = random.randint(50, HEIGHT - 50)
-                type_ = random.choice(['mine', 'jellyfish', 'coral'])
-                obstacles.append(Obstacle(WIDTH, y, type_))
-            
-            # Update collectibles
-            for collectible in collectibles[:]:
-                collectible.update(current_speed)
-                if collectible.x < -50:
-                    collectibles.remove(collectible)
-                elif not collectible.collected and submarine.get_rect().colliderect(collectible.get_rect()):
-                    score += collectible.value
-                    if collectible.type == 'treasure':
-                        treasure_collected = True
-                    collectible.collected = True
-                    collectibles.remove(collectible)
-            
-            # Update obstacles
-            for obstacle in obstacles[:]:
-                obstacle.update(current_speed)
-                if obstacle.x < -50:
-                    obstacles.remove(obstacle)
-                elif submarine.get_rect().colliderect(obstacle.get_rect()):
+            game.governor.observe_frame(dt)
+            for _ in range(timestep.advance(dt)):
+                recording.record(jump)
+                step_game(game, jump, timestep.step, profiler)
+                jump = False
+                for achievement_key in game.newly_unlocked:
+                    achievement_notifications.append((achievement_key, game.time_elapsed))
+                if game.game_over:
                     state = 'gameover'
-                    if score > high_score:
-                        high_score = score
-            
-            # Check achievements
-            newly_unlocked = check_achievements(score, time_elapsed, treasure_collected, achievements)
-            for achievement_key in newly_unlocked:
-                achievement_notifications.append((achievement_key, time_elapsed))
-            
-            # Calculate skill level
-            skill_level, skill_rank = calculate_skill_level(score, time_elapsed)
+                    high_score = game.high_score
+                    save_replay(recording, game.score, REPLAY_FILE)
+                    profile.record_run(2, game.score, game.time_elapsed, game.unlocked, recording.seed)
+                    break
         
-        # Drawing
+        # Drawing (the start, pause and game over screens don't change from
+        # frame to frame, so after their first frame nothing is marked dirty)
+        presenter.begin_frame((state, game.fatigue_level))
         if state == 'start':
             draw_start_screen(screen)
+            profiler.mark('draw')
         
         elif state == 'playing':
-            draw_background(screen, int(scroll))
+            presenter.mark_all(draw_background(screen, int(game.scroll)))
             
             # Draw game objects
-            for collectible in collectibles:
-                collectible.draw(screen)
-            for obstacle in obstacles:
-                obstacle.draw(screen)
-            submarine.draw(screen)
+            presenter.mark_all(game.collectibles.draw(screen, sprite_cache, return_rects=True))
+            presenter.mark_all(game.obstacles.draw(screen, sprite_cache, return_rects=True))
+            game.submarine.draw(screen)
+            presenter.mark(game.submarine.get_rect().inflate(20, 20))
+            profiler.mark('draw')
             
             # Draw HUD
-            draw_hud(screen, score, high_score, time_elapsed, 
-                    current_speed / BASE_SPEED, difficulty_mult, skill_level, skill_rank)
+            presenter.mark_all(draw_hud(screen, game.score, high_score, game.time_elapsed, 
+                                        game.current_speed / BASE_SPEED, game.difficulty_mult,
+                                        game.skill_level, game.skill_rank))
+            profiler.mark('hud')
             
             # Draw fatigue overlay (NEGATIVE DISENGAGEMENT)
-            draw_fatigue_overlay(screen, fatigue_level, time_elapsed)
+            presenter.mark_all(draw_fatigue_overlay(screen, game.fatigue_level,
+                                                      game.earlier_play_time + game.time_elapsed))
             
             # Draw achievement notifications (POSITIVE ENGAGEMENT)
             for notif in achievement_notifications[:]:
                 achievement_key, unlock_time = notif
-                time_shown = time_elapsed - unlock_time
+                time_shown = game.time_elapsed - unlock_time
                 if time_shown < 3:  # Show for 3 seconds
                     alpha = 255 if time_shown < 2.5 else int(255 * (3 - time_shown) / 0.5)
-                    draw_achievement_notification(screen, achievement_key, achievements, alpha)
+                    presenter.mark(draw_achievement_notification(screen, achievement_key, achievements, alpha))
                 else:
                     achievement_notifications.remove(notif)
         
         elif state == 'paused':
-            draw_background(screen, int(scroll))
-            for collectible in collectibles:
-                collectible.draw(screen)
-            for obstacle in obstacles:
-                obstacle.draw(screen)
-            submarine.draw(screen)
-            draw_pause_screen(screen, score, time_elapsed, skill_level)
+            draw_background(screen, int(game.scroll))
+            game.collectibles.draw(screen, sprite_cache)
+            game.obstacles.draw(screen, sprite_cache)
+            game.submarine.draw(screen)
+            profiler.mark('draw')
+            draw_pause_screen(screen, game.score, game.time_elapsed, game.skill_level)
         
         elif state == 'gameover':
-            draw_game_over_screen(screen, score, high_score, time_elapsed, skill_level, achievements)
+            draw_game_over_screen(screen, game.score, high_score, game.time_elapsed,
+                                  game.skill_level, achievements)
+            profiler.mark('draw')
         
-        pygame.display.flip()
-    
+        # Frame profiler overlay (F3)
+        if profiler.enabled:
+            presenter.mark(profiler.draw_overlay(screen))
+        profiler.mark('overlays')
+        
+        presenter.present()
+        profiler.mark('flip')
+        profiler.end_frame()
+    
+    # A run cut short by closing the window still counts towards play time
+    if state in ('playing', 'paused'):
+        profile.record_run(2, game.score, game.time_elapsed, game.unlocked, recording.seed)
+    profile.close()
+    if profiler.frame and PROFILE_FILE is not None:
+        profiler.export_csv(PROFILE_FILE)
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
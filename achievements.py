@@ -0,0 +1,87 @@
+from bisect import bisect_right
+
+# ============================================================
+# ACHIEVEMENT ENGINE
+# ============================================================
+# Achievements are declared as data: each one names a metric the game
+# tracks (score, time, treasures found, ...) and the value that
+# unlocks it. The engine keeps one sorted list of thresholds per metric and
+# remembers how far along each list the player has got, so reporting a new
+# metric value only compares it with the next locked threshold. A value
+# that jumps past several thresholds at once is found with a binary search,
+# so the cost stays O(log n) however many achievements a metric has.
+#
+# Unlocks are never taken back, so the position in each list only moves
+# forward. A new run can reuse the same engine: its metrics start again
+# from zero, and everything behind the position is already unlocked.
+
+
+class AchievementEngine:
+    """
+    Threshold achievements indexed by metric
+    Args:
+        definitions: dict of key -> {'name', 'desc', 'metric', 'threshold'};
+            an achievement unlocks once its metric reaches its threshold
+    """
+
+    def __init__(self, definitions):
+        # key -> {'name', 'desc', 'unlocked'}, the dict the screens draw from
+        self.achievements = {}
+        rules = {}
+        for key, val in definitions.items():
+            self.achievements[key] = {'name': val['name'], 'desc': val['desc'], 'unlocked': False}
+            rules.setdefault(val['metric'], []).append((val['threshold'], key))
+
+        self.thresholds = {}  # metric -> sorted thresholds
+        self.keys = {}        # metric -> achievement keys, in the same order
+        self.next = {}        # metric -> index of the first threshold not yet reached
+        for metric, pairs in rules.items():
+            pairs.sort(key=lambda pair: pair[0])
+            self.thresholds[metric] = [threshold for threshold, _ in pairs]
+            self.keys[metric] = [key for _, key in pairs]
+            self.next[metric] = 0
+
+    def update(self, metric, value):
+        """
+        Report a metric's current value
+        Returns:
+            keys of the achievements this unlocked (usually none)
+        """
+        thresholds = self.thresholds.get(metric)
+        if thresholds is None:
+            return []
+        start = self.next[metric]
+        if start == len(thresholds) or value < thresholds[start]:
+            return []
+        end = bisect_right(thresholds, value, start)
+        self.next[metric] = end
+        unlocked = []
+        for key in self.keys[metric][start:end]:
+            achievement = self.achievements[key]
+            if not achievement['unlocked']:
+                achievement['unlocked'] = True
+                unlocked.append(key)
+        return unlocked
+
+    def restore(self, keys):
+        """Mark achievements unlocked in an earlier session (unknown keys are skipped)"""
+        for key in keys:
+            if key in self.achievements:
+                self.achievements[key]['unlocked'] = True
+
+    def unlocked_count(self):
+        return sum(1 for a in self.achievements.values() if a['unlocked'])
+
+    # Read like the plain achievements dict, so drawing code can take either
+
+    def __getitem__(self, key):
+        return self.achievements[key]
+
+    def items(self):
+        return self.achievements.items()
+
+    def values(self):
+        return self.achievements.values()
+
+    def __len__(self):
+        return len(self.achievements)
@@ -0,0 +1,99 @@
+import os
+import struct
+
+from story_engine import Session
+
+# ============================================================
+# ADVENTURE SAVES
+# ============================================================
+# A save is just where a Session stands: the node it is on, the player's
+# name, the story variables (friends_made, ...) and the choices made so
+# far. That fits in a few dozen bytes, so the game writes one after every
+# choice, and resuming puts the player straight back at that passage
+# without typing out everything before it.
+#
+# File layout (little-endian):
+#   magic "ADVS", format version (1 byte), story fingerprint (4 bytes),
+#   node number (4 bytes), name length (1 byte), variable count (1 byte),
+#   history length (2 bytes), then the name (UTF-8), one signed 4-byte
+#   value per variable in the story's order, and one unsigned 2-byte
+#   choice number per choice made.
+#
+# The fingerprint is Story.fingerprint, a CRC of the story's node names,
+# so a save made before the story was edited is refused instead of
+# resuming at the wrong passage.
+
+MAGIC = b"ADVS"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sBIIBBH")
+MAX_HISTORY = 0xFFFF  # oldest choices are dropped beyond this
+MAX_CHOICE = 0xFFFF  # largest choice number a save can hold
+
+
+def to_bytes(session):
+    """
+    Encode a Session as a save
+    Raises:
+        ValueError: if a choice number is too big for the format
+    """
+    story = session.story
+    name = session.player_name.encode("utf-8")[:255]
+    values = [session.variables[var] for var in story.variables]
+    history = session.history[-MAX_HISTORY:]
+    if history and not 1 <= min(history) <= max(history) <= MAX_CHOICE:
+        raise ValueError(f"choice numbers must be between 1 and {MAX_CHOICE} to be saved")
+    return (HEADER.pack(MAGIC, FORMAT_VERSION, story.fingerprint, session.node,
+                        len(name), len(values), len(history))
+            + name + struct.pack(f"<{len(values)}i", *values)
+            + struct.pack(f"<{len(history)}H", *history))
+
+
+def from_bytes(story, data):
+    """
+    Rebuild a Session of story from a save
+    Raises:
+        ValueError: if the data isn't a save of this story
+    """
+    magic, version, story_crc, node, name_len, var_count, history_len = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not an adventure save")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported save format version {version}")
+    if story_crc != story.fingerprint or var_count != len(story.variables) or node >= len(story):
+        raise ValueError("save was made with a different version of the story")
+    offset = HEADER.size
+    name = data[offset:offset + name_len].decode("utf-8", errors="replace")
+    offset += name_len
+    values = struct.unpack_from(f"<{var_count}i", data, offset)
+    offset += 4 * var_count
+    if len(data) < offset + 2 * history_len:
+        raise ValueError("save file is truncated")
+    history = list(struct.unpack_from(f"<{history_len}H", data, offset))
+    return Session(story, name, node, dict(zip(story.variables, values)), history)
+
+
+def save(session, path):
+    """Write a save, replacing the old one in a single step"""
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(to_bytes(session))
+    os.replace(temp, path)
+
+
+def load(story, path):
+    """The saved Session at path, or None if there is no usable save"""
+    try:
+        with open(path, "rb") as f:
+            return from_bytes(story, f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Could not load saved adventure: {e}")
+        return None
+
+
+def delete(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import sys
+
+from CHOOSE_YOUR_ADVENTURE import (STORY, TITLE, NAME_PROMPT, DEFAULT_NAME, INTRO, CHOICE_PROMPT,
+                                   WIN_BANNER, TRY_AGAIN_BANNER, GOODBYE, pick_again_message)
+from story_engine import compile_story, Session
+from story_pack import PackedStory
+from typewriter import paced_chunks
+
+# ============================================================
+# ADVENTURE SERVER
+# ============================================================
+# Hosts the adventure over TCP so a whole class can play at once, each
+# with their own story: connect with `telnet HOST 4000` or `nc HOST 4000`.
+#
+# Every connection is one coroutine with its own Session, so nothing is
+# shared between players. Passages are typed with asyncio.sleep between
+# chunks instead of time.sleep, so one process serves thousands of
+# players; pressing Enter while a passage types shows the rest at once.
+#
+# Limits, so one player can't hold up or swamp the server:
+#   - a player who sends nothing for IDLE_TIMEOUT seconds is disconnected
+#   - input lines longer than MAX_LINE bytes end the session
+#   - output is sent with back-pressure; a client that stops reading is
+#     dropped once MAX_OUTPUT bytes are waiting for it
+#
+# Usage:
+#   python adventure_server.py [--host HOST] [--port PORT]
+
+IDLE_TIMEOUT = 300  # seconds
+MAX_LINE = 1024  # bytes per line of input
+MAX_OUTPUT = 64 * 1024  # bytes of unsent output per player
+MAX_NAME = 24  # characters
+MAX_SESSIONS = 5000
+CPS = 33  # typing speed, characters per second
+TITLE_CPS = 20
+
+
+class SessionClosed(Exception):
+    """The player left, idled out or went over a limit"""
+
+
+class Connection:
+    """One player's socket, with typed output and timed input"""
+
+    def __init__(self, reader, writer, idle_timeout=IDLE_TIMEOUT, cps=CPS):
+        self.reader = reader
+        self.writer = writer
+        self.idle_timeout = idle_timeout
+        self.cps = cps
+        writer.transport.set_write_buffer_limits(high=MAX_OUTPUT // 2)
+
+    def write(self, text):
+        # Telnet wants \r\n line endings
+        self.writer.write(text.replace("\n", "\r\n").encode("utf-8"))
+        if self.writer.transport.get_write_buffer_size() > MAX_OUTPUT:
+            raise SessionClosed("not reading output")
+
+    async def drain(self):
+        try:
+            await asyncio.wait_for(self.writer.drain(), self.idle_timeout)
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            raise SessionClosed("not reading output") from e
+
+    async def send(self, text):
+        self.write(text)
+        await self.drain()
+
+    async def type(self, text, cps=None):
+        """Type text then a newline; Enter shows the rest of the passage at once"""
+        cps = cps or self.cps
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        written = 0
+        for chunk, due in paced_chunks(text, cps):
+            wait = start + due - loop.time()
+            if wait > 0 and await self.skip_pressed(wait):
+                self.write(text[written:])
+                break
+            self.write(chunk)
+            written += len(chunk)
+            await self.drain()
+        await self.send("\n")
+
+    async def skip_pressed(self, timeout):
+        """Wait up to timeout seconds; True if the player pressed Enter"""
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        except ValueError as e:
+            raise SessionClosed("line too long") from e
+        if not line:
+            raise SessionClosed("disconnected")
+        return True
+
+    async def ask(self, prompt):
+        """Send prompt and return the player's next line (without the newline)"""
+        await self.send(prompt)
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), self.idle_timeout)
+        except asyncio.TimeoutError as e:
+            self.write("\nNo answer for a while - see you next time!\n")
+            raise SessionClosed("idle") from e
+        except ValueError as e:
+            raise SessionClosed("line too long") from e
+        if not line:
+            raise SessionClosed("disconnected")
+        text = line.decode("utf-8", errors="replace")
+        # Drop telnet negotiation bytes and other control characters
+        return "".join(char for char in text if char.isprintable()).strip()
+
+
+# ---------------- Playing one session ---------------- #
+
+async def separator(conn):
+    await conn.send("\n" + "~" * 50 + "\n\n")
+
+
+async def play_session(conn, story):
+    """The same game as CHOOSE_YOUR_ADVENTURE.main(), over a Connection"""
+    await separator(conn)
+    await conn.type(TITLE, TITLE_CPS)
+    await separator(conn)
+
+    player_name = (await conn.ask(NAME_PROMPT))[:MAX_NAME] or DEFAULT_NAME
+    for line in INTRO:
+        await conn.type(line.format(player_name=player_name))
+    await asyncio.sleep(1)
+
+    session = Session(story, player_name)
+    while True:
+        options = session.options()
+        if session.ending is not None or not options:
+            await game_over(conn, session.passage(), bool(session.ending))
+            return
+
+        await separator(conn)
+        await conn.type(session.passage())
+        await separator(conn)
+        await conn.send("".join(f"{number}. {label}\n" for number, label in enumerate(options, 1)))
+
+        valid = [str(number) for number in range(1, len(options) + 1)]
+        while True:
+            choice = await conn.ask(CHOICE_PROMPT)
+            if choice in valid:
+                break
+            await conn.send(pick_again_message(valid) + "\n")
+        session.choose(int(choice))
+
+
+async def game_over(conn, message, success):
+    await separator(conn)
+    await conn.type(WIN_BANNER if success else TRY_AGAIN_BANNER)
+    await conn.send("\n")
+    await conn.type(message)
+    await separator(conn)
+    await conn.type(GOODBYE)
+
+
+# ---------------- Server ---------------- #
+
+class AdventureServer:
+    """
+    Accepts players and runs a session for each
+    Args:
+        story: compiled Story every session plays
+        idle_timeout, cps, max_sessions: see the settings above
+    """
+
+    def __init__(self, story, idle_timeout=IDLE_TIMEOUT, cps=CPS, max_sessions=MAX_SESSIONS):
+        self.story = story
+        self.idle_timeout = idle_timeout
+        self.cps = cps
+        self.max_sessions = max_sessions
+        self.active = 0
+        self.served = 0
+
+    async def handle(self, reader, writer):
+        conn = Connection(reader, writer, self.idle_timeout, self.cps)
+        try:
+            if self.active >= self.max_sessions:
+                await conn.send("The ocean is full right now - please try again in a minute!\n")
+                return
+            self.active += 1
+            self.served += 1
+            try:
+                await play_session(conn, self.story)
+            finally:
+                self.active -= 1
+        except (SessionClosed, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE, backlog=1024)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Adventure server listening on {addresses}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host THE LITTLE FISH'S BIG ADVENTURE over TCP")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--cps", type=float, default=CPS, help="typing speed in characters per second")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds before an idle player is dropped")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--pack", help="serve this story pack instead of the built-in story")
+    args = parser.parse_args(argv)
+
+    story = PackedStory(args.pack) if args.pack else compile_story(STORY)
+    server = AdventureServer(story, args.idle_timeout, args.cps, args.max_sessions)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import argparse
+import csv
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import headless  # no window or sound card; must come before pygame
+
+import numpy as np
+
+import Chandrasekaran_deepseaexplorer_2 as v2
+from replay import load_edition
+
+# ============================================================
+# MONTE CARLO BALANCER
+# ============================================================
+# Plays thousands of seeded headless games of either edition with a
+# scripted pilot, for every combination of the tuning constants given on
+# the command line, and reports how long runs last, what they score and
+# which calculate_skill_level rank they end on. Games are split into
+# batches and spread over a process pool, one worker per core.
+#
+# Tuning constants are module-level settings, so a worker sets them on its
+# copy of the game module for the length of a batch and puts them back
+# afterwards. A constant an edition doesn't have (v1 has no difficulty
+# curve settings) is left out for that edition.
+#
+# Usage:
+#   python balance.py --runs 500 --set GRAVITY=0.25,0.3,0.35 --set JUMP_STRENGTH=-5,-6
+#   python balance.py --edition 2 --pilot random --set DIFFICULTY_MULTIPLIER=1.01,1.02,1.03
+#   python balance.py --set SPAWN_MULTIPLIER=1.01,1.015 --csv balance.csv
+
+TUNABLE = ['DIFFICULTY_MULTIPLIER', 'SPAWN_MULTIPLIER', 'BASE_SPAWN_RATE', 'GRAVITY', 'JUMP_STRENGTH']
+RANKS = ["Beginner", "Novice Diver", "Skilled Navigator", "Expert Explorer",
+         "Master of the Deep", "Legendary Ocean Lord"]
+
+
+# ---------------- Pilots ---------------- #
+# A pilot is made once per run (so it can keep its own seeded generator)
+# and called every step with the GameState; it returns True to jump.
+
+def hover_pilot(game, seed):
+    """Jump whenever the submarine sinks below the middle of the screen"""
+    middle = (game.HEIGHT if hasattr(game, 'HEIGHT') else game.SCREEN_HEIGHT) / 2
+    return lambda state: state.submarine.y > middle
+
+
+def random_pilot(game, seed, jump_chance=0.06):
+    """Jump at random, about jump_chance of the steps"""
+    rng = random.Random(seed ^ 0x5EED)
+    return lambda state: rng.random() < jump_chance
+
+
+PILOTS = {'hover': hover_pilot, 'random': random_pilot}
+
+
+# ---------------- Workers ---------------- #
+
+def play(game, edition, pilot, seed, max_time):
+    """
+    Play one run to the end (or max_time seconds)
+    Returns:
+        (seconds survived, score, skill rank)
+    """
+    state = game.GameState(seed)
+    if edition == 1:
+        max_steps = int(max_time * game.STEP_RATE)
+        while not state.game_over and state.steps < max_steps:
+            game.update_game(state, pilot(state))
+        seconds = state.steps / game.STEP_RATE
+    else:
+        dt = 1.0 / game.STEP_RATE
+        while not state.game_over and state.time_elapsed < max_time:
+            game.step_game(state, pilot(state), dt)
+        seconds = state.time_elapsed
+    score = state.score
+    state.release()
+    # Both editions are ranked with the v2 rules, so their results compare
+    return seconds, score, v2.calculate_skill_level(score, seconds)[1]
+
+
+def run_batch(edition, params, seeds, pilot_name, max_time):
+    """Play one run per seed with params applied. Runs in a worker process."""
+    game = load_edition(edition)
+    saved = {name: getattr(game, name) for name in params}
+    for name, value in params.items():
+        setattr(game, name, value)
+    try:
+        make_pilot = PILOTS[pilot_name]
+        return [play(game, edition, make_pilot(game, seed), seed, max_time) for seed in seeds]
+    finally:
+        for name, value in saved.items():
+            setattr(game, name, value)
+
+
+# ---------------- Sweep ---------------- #
+
+def parse_sets(items):
+    """['GRAVITY=0.25,0.3', ...] -> {'GRAVITY': [0.25, 0.3], ...}"""
+    sweep = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if name not in TUNABLE or not values:
+            raise SystemExit(f"--set expects NAME=V1,V2,... with NAME one of {', '.join(TUNABLE)}")
+        sweep[name] = [float(value) for value in values.split(",")]
+    return sweep
+
+
+def parameter_sets(sweep):
+    """Every combination of the swept values, as a list of dicts"""
+    names = list(sweep)
+    return [dict(zip(names, values)) for values in itertools.product(*(sweep[n] for n in names))]
+
+
+def applicable(edition, params):
+    game = load_edition(edition)
+    return {name: value for name, value in params.items() if hasattr(game, name)}
+
+
+def run_sweep(editions, sweep, runs, pilot_name, max_time, workers, first_seed=0):
+    """
+    Play runs games for each edition and parameter set
+    Returns:
+        list of (edition, params, results array with columns seconds, score, rank)
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = []
+    for edition in editions:
+        for params in parameter_sets(sweep):
+            params = applicable(edition, params)
+            if (edition, params) not in jobs:
+                jobs.append((edition, params))
+    seeds = list(range(first_seed, first_seed + runs))
+    # Several batches per worker, so a slow parameter set doesn't leave cores idle
+    batch_size = max(1, math.ceil(runs * len(jobs) / (workers * 4)))
+    batches = [seeds[i:i + batch_size] for i in range(0, runs, batch_size)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [[pool.submit(run_batch, edition, params, batch, pilot_name, max_time)
+                    for batch in batches] for edition, params in jobs]
+        return [(edition, params, np.array([result for future in job for result in future.result()]))
+                for (edition, params), job in zip(jobs, futures)]
+
+
+# ---------------- Report ---------------- #
+
+def summarize(results, max_time):
+    seconds, scores, ranks = results[:, 0], results[:, 1], results[:, 2].astype(int)
+    t10, t50, t90 = np.percentile(seconds, (10, 50, 90))
+    s50, s90 = np.percentile(scores, (50, 90))
+    return {
+        'runs': len(results),
+        'time_mean': seconds.mean(), 'time_p10': t10, 'time_p50': t50, 'time_p90': t90,
+        'survived': np.mean(seconds >= max_time),
+        'score_mean': scores.mean(), 'score_p50': s50, 'score_p90': s90,
+        'ranks': np.bincount(ranks, minlength=len(RANKS)) / len(results),
+    }
+
+
+def describe(params):
+    return " ".join(f"{name}={value:g}" for name, value in params.items()) or "(defaults)"
+
+
+def report(sweep_results, max_time):
+    rows = []
+    for edition, params, results in sweep_results:
+        stats = summarize(results, max_time)
+        rows.append((edition, params, stats))
+        print(f"v{edition} {describe(params)}  ({stats['runs']} runs)")
+        print(f"  survival s   mean {stats['time_mean']:7.1f}  p10 {stats['time_p10']:7.1f}  "
+              f"p50 {stats['time_p50']:7.1f}  p90 {stats['time_p90']:7.1f}  "
+              f"reached {max_time:g}s {stats['survived']:6.1%}")
+        print(f"  score        mean {stats['score_mean']:7.1f}  p50 {stats['score_p50']:7.1f}  "
+              f"p90 {stats['score_p90']:7.1f}")
+        print("  ranks        " + "  ".join(f"{name} {share:.1%}"
+                                            for name, share in zip(RANKS, stats['ranks']) if share))
+    return rows
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["edition"] + TUNABLE + ["runs", "time_mean", "time_p10", "time_p50", "time_p90",
+                                                 "survived", "score_mean", "score_p50", "score_p90"] + RANKS)
+        for edition, params, stats in rows:
+            writer.writerow([edition] + [params.get(name, "") for name in TUNABLE]
+                            + [stats[key] for key in ("runs", "time_mean", "time_p10", "time_p50", "time_p90",
+                                                      "survived", "score_mean", "score_p50", "score_p90")]
+                            + list(stats['ranks']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deep Sea Explorer Monte Carlo difficulty balancer")
+    parser.add_argument("--edition", type=int, nargs="+", choices=[1, 2], default=[1, 2])
+    parser.add_argument("--runs", type=int, default=200, help="games per edition and parameter set (default 200)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=V1,V2",
+                        help=f"values to sweep for one of {', '.join(TUNABLE)} (repeatable)")
+    parser.add_argument("--pilot", choices=sorted(PILOTS), default="hover")
+    parser.add_argument("--max-time", type=float, default=300, help="stop runs after this many seconds of play")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("--csv", help="also write the summary to this CSV file")
+    args = parser.parse_args(argv)
+
+    sweep = parse_sets(args.set)
+    start = time.perf_counter()
+    sweep_results = run_sweep(args.edition, sweep, args.runs, args.pilot, args.max_time,
+                              args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+    rows = report(sweep_results, args.max_time)
+    games = sum(len(results) for _, _, results in sweep_results)
+    print(f"{games} games in {elapsed:.1f}s")
+    if args.csv:
+        write_csv(args.csv, rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
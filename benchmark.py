@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import headless  # no window or sound card; must come before pygame
+
+import pygame
+
+import deep_sea_explorer as v1
+import Chandrasekaran_deepseaexplorer_2 as v2
+from sprite_cache import sprite_cache
+
+# ============================================================
+# BENCHMARKS
+# ============================================================
+# Measures the per-frame cost of both editions:
+#   - the update (move + cull), collision and draw phases of the entity
+#     tables, with 10, 100, 1,000 and 10,000 entities on screen
+#   - a whole logic step (v1 update_game, v2 step_game) with 10 to 80
+#     entities alive, the counts real games actually reach, where the
+#     fixed cost of each table call matters more than the per-entity cost
+#   - draw_background, draw_hud and create_sound_wave on their own
+#   - each edition's real main() loop, fed scripted key presses
+# and compares the results with benchmark_baseline.json. It also plays a
+# long v2 run to check the spawn governor keeps the obstacle/collectible
+# mix once the entity budget is reached (see spawn_mix_check).
+#
+# Usage:
+#   python benchmark.py                  run and compare with the baseline
+#   python benchmark.py --save-baseline  run and store the results as the new baseline
+#   python benchmark.py --quick          fewer repeats, for a fast check
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+ENTITY_COUNTS = [10, 100, 1000, 10000]
+STEP_ENTITY_COUNTS = [10, 20, 40, 80]
+STEPS_PER_ROUND = 60
+SPAWN_MIX_SEED = 7
+SPAWN_MIX_SECONDS = 400
+
+
+def time_call(func, repeat, rounds=5):
+    """Best average seconds per call of func() over a few rounds"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def fill_table(table, count, width, height, seed=0):
+    """Spread count entities over the screen, in x order like the games spawn them"""
+    rng = random.Random(seed)
+    table.clear()
+    n_types = len(table.prototypes)
+    for i in range(count):
+        x = width * (i + 0.5) / count
+        table.spawn(x, rng.randint(50, height - 50), rng.randrange(n_types))
+
+
+def entity_benchmarks(name, game, width, height, screen, quick):
+    """Update, collision and draw cost per frame for each entity count"""
+    results = {}
+    state = game.GameState(seed=0)
+    sub_rect = state.submarine.get_rect()
+    for count in ENTITY_COUNTS:
+        repeat = max(5, (20000 if not quick else 2000) // count)
+        for label, table in (("collectibles", state.collectibles), ("obstacles", state.obstacles)):
+            fill_table(table, count, width, height)
+
+            def update():
+                # Move right then back, so nothing ever leaves the screen
+                table.move(-0.5)
+                table.move(0.5)
+                table.cull_off_screen()
+
+            results[f"{name}.{label}.update.{count}"] = (time_call(update, repeat), count)
+            results[f"{name}.{label}.collision.{count}"] = (time_call(lambda: table.collide(sub_rect), repeat), count)
+            results[f"{name}.{label}.draw.{count}"] = (time_call(lambda: table.draw(screen, sprite_cache),
+                                                                 max(2, repeat // 10)), count)
+    return results
+
+
+def step_benchmarks(name, game, step, width, height, quick):
+    """
+    Seconds per logic step with about count entities alive, split evenly
+    between collectibles and obstacles. Crashes are ignored so every round
+    runs its full length.
+    """
+    results = {}
+    rounds = 3 if quick else 10
+    for count in STEP_ENTITY_COUNTS:
+        best = float("inf")
+        for seed in range(rounds):
+            state = game.GameState(seed=seed)
+            fill_table(state.collectibles, count // 2, width, height, seed)
+            fill_table(state.obstacles, count - count // 2, width, height, seed + 1)
+            start = time.perf_counter()
+            for i in range(STEPS_PER_ROUND):
+                step(state, i % 20 == 0)
+                state.game_over = False
+            best = min(best, (time.perf_counter() - start) / STEPS_PER_ROUND)
+            state.release()
+        results[f"{name}.step.{count}"] = (best, count)
+    return results
+
+
+def drawing_benchmarks(screen, quick):
+    repeat = 50 if quick else 300
+    results = {}
+    results["v1.draw_background"] = (time_call(lambda: v1.draw_background(123), repeat), 1)
+    results["v2.draw_background"] = (time_call(lambda: v2.draw_background(screen, 123), repeat), 1)
+
+    values = iter(range(10 ** 9))
+
+    def hud():
+        score = next(values)
+        v2.draw_hud(screen, score, 5000, score / 60, 2.5, 1.8, "Skilled Navigator", 2)
+
+    results["v2.draw_hud"] = (time_call(hud, repeat), 1)
+    results["v1.create_sound_wave"] = (time_call(lambda: v1.create_sound_wave(800, 0.1), repeat), 1)
+    return results
+
+
+def main_loop_benchmark(game, start_key, frames):
+    """
+    Run an edition's real main() for a number of frames with the frame
+    limiter off, pressing start and then jumping at random
+    Returns:
+        seconds per frame
+    """
+    rng = random.Random(0)
+    frame = [0]
+    real_get = pygame.event.get
+    real_clock = pygame.time.Clock
+    real_quit = pygame.quit
+
+    class UnlimitedClock:
+        # Same interface as pygame.time.Clock, minus the sleeping
+        def __init__(self):
+            self.last = time.perf_counter()
+
+        def tick(self, framerate=0):
+            now = time.perf_counter()
+            dt, self.last = now - self.last, now
+            return dt * 1000.0
+
+    def scripted_events(*args, **kwargs):
+        real_get()
+        frame[0] += 1
+        if frame[0] > frames:
+            return [pygame.event.Event(pygame.QUIT)]
+        if frame[0] == 1 or rng.random() < 0.08:
+            return [pygame.event.Event(pygame.KEYDOWN, key=start_key)]
+        return []
+
+    pygame.event.get = scripted_events
+    pygame.time.Clock = UnlimitedClock
+    pygame.quit = lambda: None
+    saved_files = game.REPLAY_FILE, game.PLAYER_PROFILE
+    game.REPLAY_FILE = game.PLAYER_PROFILE = None
+    start = time.perf_counter()
+    try:
+        game.main()
+    except SystemExit:
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        pygame.event.get = real_get
+        pygame.time.Clock = real_clock
+        pygame.quit = real_quit
+        game.REPLAY_FILE, game.PLAYER_PROFILE = saved_files
+    return elapsed / frames
+
+
+def run(quick):
+    pygame.init()
+    screen = pygame.display.set_mode((v1.SCREEN_WIDTH, v1.SCREEN_HEIGHT))
+    v1.screen = screen
+
+    results = {}
+    results.update(entity_benchmarks("v1", v1, v1.SCREEN_WIDTH, v1.SCREEN_HEIGHT, screen, quick))
+    results.update(entity_benchmarks("v2", v2, v2.WIDTH, v2.HEIGHT, screen, quick))
+    results.update(step_benchmarks("v1", v1, v1.update_game, v1.SCREEN_WIDTH, v1.SCREEN_HEIGHT, quick))
+    results.update(step_benchmarks("v2", v2, lambda state, jump: v2.step_game(state, jump, 1.0 / v2.STEP_RATE),
+                                   v2.WIDTH, v2.HEIGHT, quick))
+    results.update(drawing_benchmarks(screen, quick))
+
+    frames = 300 if quick else 1500
+    results["v1.main"] = (main_loop_benchmark(v1, pygame.K_SPACE, frames), 1)
+    results["v2.main"] = (main_loop_benchmark(v2, pygame.K_SPACE, frames), 1)
+    return results
+
+
+def spawn_mix_check(seed=SPAWN_MIX_SEED, seconds=SPAWN_MIX_SECONDS):
+    """
+    Play one long v2 run (crashes ignored) and compare the obstacle/collectible
+    ratio in the first and last minute after the live count reaches the
+    governor's budget. The late game must not get easier.
+    Returns:
+        (ratio in the first minute, ratio in the last minute), or None if
+        the budget was never reached
+    """
+    state = v2.GameState(seed=seed)
+    budget = state.governor.budget()
+    per_minute = 60 * v2.STEP_RATE
+    samples = []  # (collectibles, obstacles) each step once the budget is reached
+    for i in range(seconds * v2.STEP_RATE):
+        v2.step_game(state, i % 25 == 0, 1.0 / v2.STEP_RATE)
+        state.game_over = False
+        live = (len(state.collectibles), len(state.obstacles))
+        if samples or sum(live) >= budget:
+            samples.append(live)
+    state.release()
+    if len(samples) < 2 * per_minute:
+        return None
+
+    def ratio(window):
+        return sum(o for _, o in window) / max(1, sum(c for c, _ in window))
+
+    return ratio(samples[:per_minute]), ratio(samples[-per_minute:])
+
+
+def report(results, baseline, tolerance):
+    """Print one line per benchmark. Returns the names that got slower."""
+    slower = []
+    print(f"{'benchmark':42} {'per frame':>12} {'ns/entity':>10} {'frames/s':>10}  vs baseline")
+    for name, (seconds, count) in results.items():
+        line = f"{name:42} {seconds * 1e6:10.1f}us {seconds * 1e9 / count:10.0f} {1 / seconds:10.0f}"
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += f"  {change:+7.1%}"
+            if change > tolerance:
+                line += "  SLOWER"
+                slower.append(name)
+        print(line)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deep Sea Explorer per-frame benchmarks")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="fraction slower than the baseline that counts as a regression (default 0.25)")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+
+    results = run(args.quick)
+    slower = report(results, baseline, args.tolerance)
+
+    mix = spawn_mix_check()
+    if mix is None:
+        print("spawn mix: the entity budget was never reached")
+    else:
+        first, last = mix
+        print(f"spawn mix: obstacles per collectible {first:.2f} in the first minute at the budget, {last:.2f} in the last")
+        if last < first * 0.9:
+            print("spawn mix: obstacles are being squeezed out late in the run")
+            slower.append("spawn_mix")
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump({name: seconds for name, (seconds, _) in results.items()}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {BASELINE_FILE}")
+        return 0
+    if slower:
+        print(f"{len(slower)} benchmark(s) more than {args.tolerance:.0%} slower than the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
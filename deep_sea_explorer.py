@@ -1,11 +1,20 @@
 import pygame
 import random
 import sys
+from collections import OrderedDict
 import numpy as np  # <-- required for sound buffer arrays
+from entity_store import EntityTable, ObjectPool
+from sprite_cache import sprite_cache
+from text_cache import text_cache
+from dirty_rects import DirtyRectPresenter
+from game_clock import FixedTimestep
+from replay import Recording, save_replay
+from frame_profiler import FrameProfiler
+from profile_store import ProfileStore
 
-# Initialize pygame and mixer for sound
+# Initialize pygame (the window and the sound mixer are only opened in
+# main(), so the game logic can be imported and run without them)
 pygame.init()
-pygame.mixer.init()
 
 # Screen dimensions
 SCREEN_WIDTH = 800
@@ -25,10 +34,28 @@ WHITE = (255, 255, 255)
 LIGHT_BLUE = (135, 206, 235)
 YELLOW = (255, 255, 0)
 
-# Create screen
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Deep Sea Explorer")
-clock = pygame.time.Clock()
+# Push only changed screen regions instead of flipping every frame
+USE_DIRTY_RECTS = True
+
+# Game logic steps per second (independent of how fast frames are drawn)
+STEP_RATE = 60
+
+# Submarine physics
+GRAVITY = 0.3
+JUMP_STRENGTH = -6
+
+# Each finished run is saved here for replay.py (None = don't save)
+REPLAY_FILE = "last_run_v1.dsr"
+
+# High score and play time are kept here between sessions (None = don't save)
+PLAYER_PROFILE = "player_v1"
+
+# F3 shows a per-phase frame profiler; its timings are written here on exit
+PROFILE_FILE = "frame_profile_v1.csv"
+PROFILE_PHASES = ['events', 'submarine', 'spawn', 'collectibles', 'obstacles', 'draw', 'hud', 'overlays', 'flip']
+
+# Screen, created in main()
+screen = None
 
 # Font
 font_large = pygame.font.Font(None, 72)
@@ -48,29 +75,66 @@ def create_sound_wave(frequency, duration):
     stereo_wave = np.column_stack((wave, wave))  # duplicate for stereo
     return stereo_wave
 
+class SoundBank:
+    """Keeps synthesized sounds so each (frequency, duration, volume) is built once.
+    Holds at most max_sounds; the least recently played one is dropped first."""
+    def __init__(self, max_sounds=32):
+        self.max_sounds = max_sounds
+        self.sounds = OrderedDict()
+    
+    def get(self, frequency, duration, volume):
+        key = (frequency, duration, volume)
+        sound = self.sounds.get(key)
+        if sound is None:
+            sound = pygame.mixer.Sound(buffer=create_sound_wave(frequency, duration))
+            sound.set_volume(volume)
+            self.sounds[key] = sound
+            if len(self.sounds) > self.max_sounds:
+                self.sounds.popitem(last=False)
+        else:
+            self.sounds.move_to_end(key)
+        return sound
+    
+    def play(self, frequency, duration, volume):
+        self.get(frequency, duration, volume).play()
+
+sound_bank = SoundBank()
+
+COLLECT_SOUND = (800, 0.1, 0.3)
+COLLISION_SOUND = (150, 0.2, 0.3)
+
+def preload_sounds():
+    """Synthesize the game's fixed sounds up front so the first pickup doesn't stall"""
+    sound_bank.get(*COLLECT_SOUND)
+    sound_bank.get(*COLLISION_SOUND)
+
 def play_collect_sound():
-    sound = pygame.mixer.Sound(buffer=create_sound_wave(800, 0.1))
-    sound.set_volume(0.3)
-    sound.play()
+    sound_bank.play(*COLLECT_SOUND)
 
 def play_collision_sound():
-    sound = pygame.mixer.Sound(buffer=create_sound_wave(150, 0.2))
-    sound.set_volume(0.3)
-    sound.play()
+    sound_bank.play(*COLLISION_SOUND)
 
 # ---------------- GAME CLASSES ---------------- #
+# Entity classes use __slots__ and keep one Rect each, updated in place by
+# get_rect(), so collision checks don't allocate
 
 class Submarine:
+    __slots__ = ('x', 'y', 'width', 'height', 'velocity_y', 'gravity', 'rect')
+    
     def __init__(self):
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset()
+    
+    def reset(self):
         self.x = 100
         self.y = SCREEN_HEIGHT // 2
         self.width = 60
         self.height = 30
         self.velocity_y = 0
-        self.gravity = 0.3
+        self.gravity = GRAVITY
         
     def move_up(self):
-        self.velocity_y = -6
+        self.velocity_y = JUMP_STRENGTH
     
     def update(self):
         self.velocity_y += self.gravity
@@ -88,10 +152,17 @@ class Submarine:
         pygame.draw.rect(surface, GOLD, (self.x + 35, self.y - 5, 3, 10))
     
     def get_rect(self):
-        return pygame.Rect(self.x, self.y, self.width, self.height)
+        self.rect.update(self.x, self.y, self.width, self.height)
+        return self.rect
 
 class Collectible:
+    __slots__ = ('x', 'y', 'width', 'height', 'type', 'value', 'color', 'rect')
+    
     def __init__(self, x, y, collectible_type):
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(x, y, collectible_type)
+    
+    def reset(self, x, y, collectible_type):
         self.x = x
         self.y = y
         self.width = 25
@@ -121,13 +192,20 @@ class Collectible:
             pygame.draw.circle(surface, self.color, (int(self.x + 12), int(self.y + 12)), 10)
     
     def get_rect(self):
-        return pygame.Rect(self.x, self.y, self.width, self.height)
+        self.rect.update(self.x, self.y, self.width, self.height)
+        return self.rect
     
     def is_off_screen(self):
         return self.x < -self.width
 
 class Obstacle:
+    __slots__ = ('x', 'y', 'type', 'width', 'height', 'rect')
+    
     def __init__(self, x, y, obstacle_type):
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(x, y, obstacle_type)
+    
+    def reset(self, x, y, obstacle_type):
         self.x = x
         self.y = y
         self.type = obstacle_type
@@ -160,24 +238,67 @@ class Obstacle:
                 pygame.draw.rect(surface, (255, 69, 0), (int(self.x + i * 10), int(self.y - 5), 5, 10))
     
     def get_rect(self):
-        return pygame.Rect(self.x, self.y, self.width, self.height)
+        self.rect.update(self.x, self.y, self.width, self.height)
+        return self.rect
     
     def is_off_screen(self):
         return self.x < -self.width
 
+# Entity types, in the order used for the type column of the entity tables
+COLLECTIBLE_TYPES = ['pearl', 'treasure', 'coin']
+OBSTACLE_TYPES = ['mine', 'jellyfish', 'coral']
+
+# One shared prototype per type (tables only read them, and move them into
+# place to draw)
+COLLECTIBLE_PROTOTYPES = [Collectible(0, 0, t) for t in COLLECTIBLE_TYPES]
+OBSTACLE_PROTOTYPES = [Obstacle(0, 0, t) for t in OBSTACLE_TYPES]
+
+# Free lists, so starting a run reuses the last run's submarine and entity
+# tables instead of allocating new ones
+submarine_pool = ObjectPool(Submarine)
+collectible_table_pool = ObjectPool(lambda: EntityTable(COLLECTIBLE_PROTOTYPES))
+obstacle_table_pool = ObjectPool(lambda: EntityTable(OBSTACLE_PROTOTYPES))
+
 # ---------------- DRAW FUNCTIONS ---------------- #
 
+# The gradient never changes, so it is drawn once into this surface and
+# only rebuilt if the screen size or the colors change
+background_cache = {'key': None, 'surface': None}
+
+def get_background_gradient(width, height, top_color=DARK_BLUE, bottom_color=DEEP_BLUE):
+    key = (width, height, top_color, bottom_color)
+    if background_cache['key'] != key:
+        gradient = pygame.Surface((width, height)).convert()
+        for y in range(height):
+            ratio = y / height
+            color = tuple(int(top * (1 - ratio) + bottom * ratio)
+                          for top, bottom in zip(top_color, bottom_color))
+            pygame.draw.line(gradient, color, (0, y), (width, y))
+        background_cache['key'] = key
+        background_cache['surface'] = gradient
+    return background_cache['surface']
+
 def draw_background(offset):
-    for y in range(SCREEN_HEIGHT):
-        ratio = y / SCREEN_HEIGHT
-        r = int(0 * (1 - ratio) + 0 * ratio)
-        g = int(26 * (1 - ratio) + 77 * ratio)
-        b = int(51 * (1 - ratio) + 128 * ratio)
-        pygame.draw.line(screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
+    """Draw the gradient and bubbles. Returns the bubbles' Rects (the only part that moves)."""
+    screen.blit(get_background_gradient(SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0))
+    bubbles = []
     for i in range(20):
         x = int((offset * 0.5 + i * 40) % SCREEN_WIDTH)
         y = (i * 37) % SCREEN_HEIGHT
-        pygame.draw.circle(screen, (255, 255, 255, 30), (x, y), 3)
+        bubbles.append(pygame.draw.circle(screen, (255, 255, 255, 30), (x, y), 3))
+    return bubbles
+
+# Full-screen translucent layers are allocated once and reused; only their
+# alpha changes
+overlay_cache = {}
+
+def get_overlay(color):
+    overlay = overlay_cache.get(color)
+    if overlay is None:
+        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        overlay.fill(color)
+        overlay_cache[color] = overlay
+    return overlay
 
 def draw_start_screen():
     screen.fill(DARK_BLUE)
@@ -209,9 +330,8 @@ def draw_start_screen():
     screen.blit(score_info, score_rect)
 
 def draw_game_over_screen(score, high_score):
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    overlay = get_overlay(DARK_BLUE)
     overlay.set_alpha(230)
-    overlay.fill(DARK_BLUE)
     screen.blit(overlay, (0, 0))
     game_over = font_large.render("Submarine Damaged!", True, RED)
     game_over_rect = game_over.get_rect(center=(SCREEN_WIDTH // 2, 200))
@@ -228,133 +348,230 @@ def draw_game_over_screen(score, high_score):
     screen.blit(restart, restart_rect)
 
 def draw_pause_screen():
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    overlay = get_overlay(DARK_BLUE)
     overlay.set_alpha(200)
-    overlay.fill(DARK_BLUE)
     screen.blit(overlay, (0, 0))
-    paused = font_large.render("PAUSED", True, CYAN)
+    paused = text_cache.render(font_large, "PAUSED", CYAN)
     paused_rect = paused.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
     screen.blit(paused, paused_rect)
-    continue_text = font_small.render("Press P to Continue", True, WHITE)
+    continue_text = text_cache.render(font_small, "Press P to Continue", WHITE)
     continue_rect = continue_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
     screen.blit(continue_text, continue_rect)
 
+# ---------------- GAME LOGIC ---------------- #
+
+class GameState:
+    """Everything that decides how a run plays out (no drawing, no sound)"""
+    def __init__(self, seed=None, high_score=0):
+        self.rng = random.Random(seed)
+        self.score = 0
+        self.high_score = high_score
+        self.submarine = submarine_pool.acquire()
+        self.collectibles = collectible_table_pool.acquire()
+        self.obstacles = obstacle_table_pool.acquire()
+        self.background_offset = 0
+        self.game_speed = 2
+        self.spawn_timer = 0
+        self.obstacle_timer = 0
+        self.difficulty = 1.0
+        self.difficulty_timer = 0
+        self.steps = 0
+        self.game_over = False
+        # What happened in the last step, for the caller to play sounds
+        self.collected = 0
+        self.crashes = 0
+    
+    def release(self):
+        """Hand the submarine and entity tables back for the next run to reuse"""
+        submarine_pool.release(self.submarine)
+        collectible_table_pool.release(self.collectibles)
+        obstacle_table_pool.release(self.obstacles)
+
+def update_game(state, jump, profiler=None):
+    """Advance a run by one step (1/60 s). jump is True if SPACE/UP was pressed.
+    profiler is an optional FrameProfiler to time the phases with."""
+    rng = state.rng
+    submarine = state.submarine
+    if jump:
+        submarine.move_up()
+    
+    state.steps += 1
+    submarine.update()
+    state.background_offset += state.game_speed
+    if profiler:
+        profiler.mark('submarine')
+    
+    state.spawn_timer += 1
+    if state.spawn_timer > 60 / state.difficulty:
+        collectible_type = rng.choice(['pearl', 'treasure', 'coin'])
+        y_pos = rng.randint(25, SCREEN_HEIGHT - 50)
+        state.collectibles.spawn(SCREEN_WIDTH, y_pos, COLLECTIBLE_TYPES.index(collectible_type))
+        state.spawn_timer = 0
+    
+    state.obstacle_timer += 1
+    if state.obstacle_timer > 90 / state.difficulty:
+        obstacle_type = rng.choice(['mine', 'jellyfish', 'coral'])
+        y_pos = rng.randint(25, SCREEN_HEIGHT - 50)
+        state.obstacles.spawn(SCREEN_WIDTH, y_pos, OBSTACLE_TYPES.index(obstacle_type))
+        state.obstacle_timer = 0
+    if profiler:
+        profiler.mark('spawn')
+    
+    sub_rect = submarine.get_rect()
+    
+    collectibles = state.collectibles
+    collectibles.move(state.game_speed)
+    hits = collectibles.collide(sub_rect)
+    state.score += int(collectibles.value[hits].sum())
+    state.collected = len(hits)
+    collectibles.kill(hits)
+    collectibles.cull_off_screen()
+    if profiler:
+        profiler.mark('collectibles')
+    
+    obstacles = state.obstacles
+    obstacles.move(state.game_speed)
+    state.crashes = len(obstacles.collide(sub_rect))
+    if state.crashes:
+        state.game_over = True
+        if state.score > state.high_score:
+            state.high_score = state.score
+    obstacles.cull_off_screen()
+    if profiler:
+        profiler.mark('obstacles')
+    
+    state.difficulty_timer += 1
+    if state.difficulty_timer > 600:
+        state.difficulty += 0.1
+        state.game_speed += 0.2
+        state.difficulty_timer = 0
+    
+    return state
+
 # ---------------- MAIN GAME LOOP ---------------- #
 
 def main():
+    global screen
+    pygame.mixer.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Deep Sea Explorer")
+    clock = pygame.time.Clock()
+    timestep = FixedTimestep(STEP_RATE)
+    profiler = FrameProfiler(PROFILE_PHASES)
+    
+    preload_sounds()
     game_state = "start"
-    score = 0
-    high_score = 0
+    profile = ProfileStore(PLAYER_PROFILE)
+    high_score = profile.high_score
     paused = False
+    game = GameState()
+    recording = None
+    jump = False
     
-    submarine = Submarine()
-    collectibles = []
-    obstacles = []
-    
-    background_offset = 0
-    game_speed = 2
-    spawn_timer = 0
-    obstacle_timer = 0
-    difficulty = 1.0
-    difficulty_timer = 0
+    presenter = DirtyRectPresenter(USE_DIRTY_RECTS)
+    fade_frames = 0
     
     running = True
     while running:
-        clock.tick(60)
+        dt = clock.tick(60) / 1000.0
+        profiler.begin_frame()
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    profiler.toggle()
+                    presenter.mark_full()
                 if game_state == "start":
                     if event.key in (pygame.K_SPACE, pygame.K_RETURN):
                         game_state = "playing"
-                        score = 0
-                        submarine = Submarine()
-                        collectibles = []
-                        obstacles = []
-                        game_speed = 2
-                        difficulty = 1.0
-                        spawn_timer = obstacle_timer = difficulty_timer = 0
+                        seed = random.getrandbits(63)
+                        game.release()
+                        game = GameState(seed, high_score=high_score)
+                        recording = Recording(1, seed, STEP_RATE)
+                        timestep.reset()
+                        jump = False
                         paused = False
                 elif game_state == "playing":
                     if event.key in (pygame.K_SPACE, pygame.K_UP):
-                        submarine.move_up()
+                        jump = True
                     if event.key == pygame.K_p:
                         paused = not paused
+                        timestep.reset()
                 elif game_state == "gameover":
                     if event.key in (pygame.K_SPACE, pygame.K_RETURN):
                         game_state = "start"
         
+        profiler.mark('events')
+        
+        # Game logic runs in fixed steps; when frames take too long, several
+        # steps run before the next frame is drawn
+        if game_state == "playing" and not paused:
+            for _ in range(timestep.advance(dt)):
+                recording.record(jump)
+                update_game(game, jump, profiler)
+                jump = False
+                for _ in range(game.collected):
+                    play_collect_sound()
+                for _ in range(game.crashes):
+                    play_collision_sound()
+                if game.game_over:
+                    game_state = "gameover"
+                    high_score = game.high_score
+                    fade_frames = 10
+                    save_replay(recording, game.score, REPLAY_FILE)
+                    profile.record_run(1, game.score, game.steps / STEP_RATE, seed=recording.seed)
+                    break
+        
+        # The start, pause and game over screens don't change from frame to
+        # frame, so after their first frame nothing is marked dirty
+        presenter.begin_frame((game_state, paused))
         if game_state == "start":
             draw_start_screen()
+            profiler.mark('draw')
         
         elif game_state == "playing":
-            if not paused:
-                submarine.update()
-                background_offset += game_speed
-                
-                spawn_timer += 1
-                if spawn_timer > 60 / difficulty:
-                    collectible_type = random.choice(['pearl', 'treasure', 'coin'])
-                    y_pos = random.randint(25, SCREEN_HEIGHT - 50)
-                    collectibles.append(Collectible(SCREEN_WIDTH, y_pos, collectible_type))
-                    spawn_timer = 0
-                
-                obstacle_timer += 1
-                if obstacle_timer > 90 / difficulty:
-                    obstacle_type = random.choice(['mine', 'jellyfish', 'coral'])
-                    y_pos = random.randint(25, SCREEN_HEIGHT - 50)
-                    obstacles.append(Obstacle(SCREEN_WIDTH, y_pos, obstacle_type))
-                    obstacle_timer = 0
-                
-                for collectible in collectibles[:]:
-                    collectible.update(game_speed)
-                    if submarine.get_rect().colliderect(collectible.get_rect()):
-                        score += collectible.value
-                        play_collect_sound()
-                        collectibles.remove(collectible)
-                    elif collectible.is_off_screen():
-                        collectibles.remove(collectible)
-                
-                for obstacle in obstacles[:]:
-                    obstacle.update(game_speed)
-                    if submarine.get_rect().colliderect(obstacle.get_rect()):
-                        play_collision_sound()
-                        game_state = "gameover"
-                        if score > high_score:
-                            high_score = score
-                    if obstacle.is_off_screen():
-                        obstacles.remove(obstacle)
-                
-                difficulty_timer += 1
-                if difficulty_timer > 600:
-                    difficulty += 0.1
-                    game_speed += 0.2
-                    difficulty_timer = 0
+            presenter.mark_all(draw_background(game.background_offset))
+            presenter.mark_all(game.collectibles.draw(screen, sprite_cache, return_rects=True))
+            presenter.mark_all(game.obstacles.draw(screen, sprite_cache, return_rects=True))
+            game.submarine.draw(screen)
+            presenter.mark(game.submarine.get_rect().inflate(20, 20))
+            profiler.mark('draw')
             
-            draw_background(background_offset)
-            for collectible in collectibles:
-                collectible.draw(screen)
-            for obstacle in obstacles:
-                obstacle.draw(screen)
-            submarine.draw(screen)
-            
-            score_text = font_small.render(f"Score: {score}", True, YELLOW)
-            screen.blit(score_text, (10, 10))
-            high_score_text = font_tiny.render(f"High Score: {high_score}", True, YELLOW)
-            screen.blit(high_score_text, (10, 50))
-            depth_text = font_tiny.render(f"Depth Level: {int(difficulty * 10)}", True, CYAN)
-            screen.blit(depth_text, (SCREEN_WIDTH - 200, 10))
+            presenter.mark(text_cache.draw_number(screen, font_small, "Score: ", str(game.score), YELLOW, (10, 10)))
+            presenter.mark(text_cache.draw_number(screen, font_tiny, "High Score: ", str(high_score), YELLOW, (10, 50)))
+            presenter.mark(text_cache.draw_number(screen, font_tiny, "Depth Level: ", str(int(game.difficulty * 10)),
+                                                  CYAN, (SCREEN_WIDTH - 200, 10)))
+            profiler.mark('hud')
             
             if paused:
                 draw_pause_screen()
         
         elif game_state == "gameover":
-            draw_game_over_screen(score, high_score)
+            draw_game_over_screen(game.score, high_score)
+            profiler.mark('draw')
+            # The overlay is blended over the previous frame again every
+            # frame, so keep pushing the whole screen until it settles
+            if fade_frames > 0:
+                fade_frames -= 1
+                presenter.mark_full()
+        
+        # Frame profiler overlay (F3)
+        if profiler.enabled:
+            presenter.mark(profiler.draw_overlay(screen, (10, 80)))
+        profiler.mark('overlays')
         
-        pygame.display.flip()
+        presenter.present()
+        profiler.mark('flip')
+        profiler.end_frame()
     
+    # A run cut short by closing the window still counts towards play time
+    if game_state == "playing":
+        profile.record_run(1, game.score, game.steps / STEP_RATE, seed=recording.seed)
+    profile.close()
+    if profiler.frame and PROFILE_FILE is not None:
+        profiler.export_csv(PROFILE_FILE)
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,79 @@
+import pygame
+
+# ============================================================
+# DIRTY RECTANGLE PRESENTATION
+# ============================================================
+# pygame.display.flip() pushes the whole 800x600 frame to the screen even
+# when only a few things moved (and on the start, pause and game over
+# screens nothing moves at all). The presenter collects the regions that
+# were drawn this frame and pushes only those, plus last frame's regions so
+# the spots things moved away from get refreshed too.
+
+
+class DirtyRectPresenter:
+    """
+    Replacement for pygame.display.flip() that only pushes changed regions
+    Args:
+        enabled: False to always do a full flip
+        full_flip_ratio: if the dirty area is more than this fraction of the
+            screen, flip everything instead (one big copy beats many small ones)
+    """
+
+    def __init__(self, enabled=True, full_flip_ratio=0.5):
+        self.enabled = enabled
+        self.full_flip_ratio = full_flip_ratio
+        self.rects = []
+        self.last_rects = []
+        self.full = True
+        self.scene = None
+
+        # Counters, for checking how often each path is taken
+        self.full_flips = 0
+        self.partial_updates = 0
+        self.skipped = 0
+
+    def begin_frame(self, scene):
+        """
+        Start a frame. scene is anything that changes when the whole screen
+        changes (e.g. the game state); a new scene always gets a full flip.
+        """
+        if scene != self.scene:
+            self.scene = scene
+            self.full = True
+
+    def mark(self, rect):
+        """Add a region that was drawn this frame"""
+        if rect is not None:
+            self.rects.append(pygame.Rect(rect))
+
+    def mark_all(self, rects):
+        if rects:
+            for rect in rects:
+                self.mark(rect)
+
+    def mark_full(self):
+        self.full = True
+
+    def present(self):
+        """Push this frame to the display"""
+        if not self.enabled or self.full:
+            self._flip()
+        else:
+            rects = self.rects + self.last_rects
+            width, height = pygame.display.get_surface().get_size()
+            screen_area = width * height
+            dirty_area = sum(rect.width * rect.height for rect in rects)
+            if dirty_area > screen_area * self.full_flip_ratio:
+                self._flip()
+            elif rects:
+                pygame.display.update(rects)
+                self.partial_updates += 1
+            else:
+                self.skipped += 1
+        self.last_rects = self.rects
+        self.rects = []
+        self.full = False
+
+    def _flip(self):
+        pygame.display.flip()
+        self.full_flips += 1
@@ -0,0 +1,294 @@
+import math
+
+import numpy as np
+
+# ============================================================
+# ENTITY TABLE
+# ============================================================
+# Collectibles and obstacles stored as columns of NumPy arrays instead of a
+# Python list of objects, so moving, culling and collision tests run over
+# every entity at once instead of one method call per entity per frame.
+#
+# Everything spawns at the right edge and scrolls left at one shared speed,
+# so rows stay sorted by x in spawn order. The table treats itself as a
+# queue: expired entities leave from the front (head), and collision tests
+# binary-search for the few rows whose x-span can reach the submarine.
+
+
+SMALL_WINDOW = 8  # collision windows up to this many rows are tested without NumPy
+
+
+def origin_box(prototype):
+    """
+    A prototype's collision box as (dx, dy, width, height) from its (x, y),
+    worked out with the prototype moved to (0, 0) and put back afterwards
+    """
+    old_x, old_y = prototype.x, prototype.y
+    prototype.x = prototype.y = 0
+    box = prototype.get_rect()
+    result = (box.x, box.y, box.width, box.height)
+    prototype.x, prototype.y = old_x, old_y
+    return result
+
+
+class EntityTable:
+    """
+    Structure-of-arrays store for one group of entities (e.g. all obstacles)
+
+    Each row has x, y, type, size, value and alive columns, plus the
+    collision box offset from (x, y) taken from the type's prototype.
+
+    Args:
+        prototypes: one Collectible/Obstacle per type. A row's type is the
+            index of its prototype in this list.
+            The prototype is also reused to draw every row of that type.
+        capacity: starting number of rows (grows as needed)
+    """
+
+    def __init__(self, prototypes, capacity=64):
+        self.prototypes = prototypes
+        self.count = 0  # rows in use, alive or dead
+        self.live = 0  # rows alive, kept up to date so len() needs no scan
+        self.head = 0  # rows before this have all expired
+        self.x_sorted = True  # False if something spawned out of x order
+
+        # Per-type constants, read once from the prototypes
+        self.type_size = np.array([getattr(p, 'size', p.get_rect().width) for p in prototypes], dtype=np.int32)
+        self.type_value = np.array([getattr(p, 'value', 0) for p in prototypes], dtype=np.int32)
+        self.type_box = np.array([origin_box(p) for p in prototypes], dtype=np.int32)
+
+        # How far a box can reach left/right of its row's x, for the broadphase
+        self.min_offset = int(self.type_box[:, 0].min())
+        self.max_reach = int((self.type_box[:, 0] + self.type_box[:, 2]).max())
+        self.min_reach = int((self.type_box[:, 0] + self.type_box[:, 2]).min())
+
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.type = np.zeros(capacity, dtype=np.int32)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self.value = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.box = np.zeros((capacity, 4), dtype=np.int32)  # offset x, offset y, width, height
+
+    def _grow(self):
+        n = self.count
+        old = (self.x, self.y, self.type, self.size, self.value, self.alive, self.box)
+        self._allocate(len(self.x) * 2)
+        for new, prev in zip((self.x, self.y, self.type, self.size, self.value, self.alive, self.box), old):
+            new[:n] = prev[:n]
+
+    def __len__(self):
+        return self.live
+
+    def clear(self):
+        self.alive[:self.count] = False
+        self.count = 0
+        self.live = 0
+        self.head = 0
+        self.x_sorted = True
+
+    reset = clear  # so tables can be kept in an ObjectPool
+
+    def spawn(self, x, y, type_):
+        """Add one entity of prototype index type_ at (x, y)"""
+        if self.count == len(self.x):
+            self.compact()
+            if self.count == len(self.x):
+                self._grow()
+        i = self.count
+        if i > self.head and x < self.x[i - 1]:
+            self.x_sorted = False
+        self.x[i] = x
+        self.y[i] = y
+        self.type[i] = type_
+        self.size[i] = self.type_size[type_]
+        self.value[i] = self.type_value[type_]
+        self.box[i] = self.type_box[type_]
+        self.alive[i] = True
+        self.count += 1
+        self.live += 1
+        return i
+
+    def move(self, dx):
+        """Move every entity left by dx"""
+        self.x[self.head:self.count] -= dx
+
+    def _expire(self, end):
+        """Remove every row before end (all of them are past the left edge)"""
+        if end <= self.head:
+            return 0
+        gone = int(np.count_nonzero(self.alive[self.head:end]))
+        self.alive[self.head:end] = False
+        self.head = max(self.head, end)
+        self.live -= gone
+        self._skip_dead()
+        return gone
+
+    def _skip_dead(self):
+        # Collected entities leave holes; let the front of the queue pass them
+        alive = self.alive
+        while self.head < self.count and not alive[self.head]:
+            self.head += 1
+
+    def cull(self, min_x):
+        """Remove entities with x < min_x. Returns how many were removed."""
+        if not self.x_sorted:
+            return self._cull_mask(self.x[:self.count] < min_x)
+        end = self.head + int(self.x[self.head:self.count].searchsorted(min_x, 'left'))
+        return self._expire(end)
+
+    def cull_off_screen(self):
+        """Remove entities whose box is entirely past the left edge"""
+        n = self.count
+        if not self.x_sorted:
+            return self._cull_mask(self.x[:n] + self.box[:n, 0] + self.box[:n, 2] < 0)
+        # Rows before sure_end are off screen whatever their type; rows from
+        # there to maybe_end depend on their own box width
+        h = self.head
+        sure_end = h + int(self.x[h:n].searchsorted(-self.max_reach, 'left'))
+        maybe_end = h + int(self.x[h:n].searchsorted(-self.min_reach, 'left'))
+        gone = self._expire(sure_end)
+        h = self.head
+        if h < maybe_end:
+            band = self.alive[h:maybe_end] & (self.x[h:maybe_end] + self.box[h:maybe_end, 0]
+                                              + self.box[h:maybe_end, 2] < 0)
+            self.alive[h:maybe_end] &= ~band
+            band_gone = int(np.count_nonzero(band))
+            self.live -= band_gone
+            gone += band_gone
+            self._skip_dead()
+        return gone
+
+    def _cull_mask(self, mask):
+        n = self.count
+        gone = self.alive[:n] & mask
+        self.alive[:n] &= ~gone
+        self._skip_dead()
+        count = int(np.count_nonzero(gone))
+        self.live -= count
+        return count
+
+    def collide(self, rect):
+        """
+        Find entities whose box overlaps a pygame.Rect
+        Matches pygame's colliderect(), including Rect truncating floats
+        Returns:
+            array of row indices, in spawn order
+        """
+        if not self.live:
+            return np.empty(0, dtype=np.intp)
+        # Broadphase: only rows whose x could put their box over the rect
+        # (one pixel of slack either side covers the truncation)
+        if self.x_sorted:
+            xs = self.x[self.head:self.count]
+            lo = self.head + int(xs.searchsorted(rect.left - self.max_reach - 1, 'left'))
+            hi = self.head + int(xs.searchsorted(rect.right - self.min_offset + 1, 'right'))
+        else:
+            lo, hi = 0, self.count
+        if lo >= hi:
+            return np.empty(0, dtype=np.intp)
+
+        # Narrow test on that window only. The window is usually a row or
+        # two, where a plain loop is cheaper than a handful of NumPy calls.
+        if hi - lo <= SMALL_WINDOW:
+            xs = self.x[lo:hi].tolist()
+            ys = self.y[lo:hi].tolist()
+            alive = self.alive[lo:hi].tolist()
+            boxes = self.box[lo:hi].tolist()
+            hits = []
+            for i in range(hi - lo):
+                if alive[i]:
+                    dx, dy, w, h = boxes[i]
+                    left = math.trunc(xs[i] + dx)
+                    top = math.trunc(ys[i] + dy)
+                    if left < rect.right and left + w > rect.left and top < rect.bottom and top + h > rect.top:
+                        hits.append(lo + i)
+            return np.array(hits, dtype=np.intp)
+
+        box = self.box[lo:hi]
+        left = np.trunc(self.x[lo:hi] + box[:, 0])
+        top = np.trunc(self.y[lo:hi] + box[:, 1])
+        hit = (self.alive[lo:hi]
+               & (left < rect.right) & (left + box[:, 2] > rect.left)
+               & (top < rect.bottom) & (top + box[:, 3] > rect.top))
+        return lo + np.flatnonzero(hit)
+
+    def kill(self, indices):
+        """Remove rows by index (e.g. the hits from collide(); each must be alive)"""
+        self.live -= len(indices)
+        self.alive[indices] = False
+        self._skip_dead()
+
+    def alive_indices(self):
+        return self.head + np.flatnonzero(self.alive[self.head:self.count])
+
+    def compact(self):
+        """Drop dead rows, keeping the survivors in spawn order"""
+        keep = self.alive_indices()
+        k = len(keep)
+        for column in (self.x, self.y, self.type, self.size, self.value, self.alive, self.box):
+            column[:k] = column[keep]
+        self.alive[k:self.count] = False
+        self.count = k
+        self.head = 0
+
+    def draw(self, surface, sprites=None, return_rects=False):
+        """
+        Draw every live entity
+        Args:
+            surface: surface to draw on
+            sprites: SpriteCache to blit pre-rendered sprites from in one
+                Surface.blits() call (None = call each prototype's draw())
+            return_rects: return the list of Rects drawn (sprites only)
+        """
+        prototypes = self.prototypes
+        alive = self.alive_indices()
+        types = self.type[alive].tolist()
+        if sprites is None:
+            for x, y, type_ in zip(self.x[alive].tolist(), self.y[alive].tolist(), types):
+                proto = prototypes[type_]
+                old_x, old_y = proto.x, proto.y
+                proto.x = x
+                proto.y = y
+                proto.draw(surface)
+                proto.x, proto.y = old_x, old_y
+            return
+        looks = [sprites.get(proto) for proto in prototypes]
+        xs = self.x[alive].astype(np.int64).tolist()
+        ys = self.y[alive].astype(np.int64).tolist()
+        blit_list = []
+        for x, y, type_ in zip(xs, ys, types):
+            sprite, dx, dy = looks[type_]
+            blit_list.append((sprite, (x + dx, y + dy)))
+        return surface.blits(blit_list, doreturn=return_rects)
+
+
+# ============================================================
+# OBJECT POOL
+# ============================================================
+
+class ObjectPool:
+    """
+    Free list of reusable objects
+    Args:
+        factory: called to make a new object when the free list is empty
+    Objects handed back with release() are reused by acquire(), which calls
+    their reset(*args) method to put them back in their starting state.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.free = []
+
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            return obj
+        return self.factory(*args)
+
+    def release(self, obj):
+        self.free.append(obj)
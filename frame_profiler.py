@@ -0,0 +1,129 @@
+import csv
+import time
+
+import numpy as np
+import pygame
+
+# ============================================================
+# FRAME PROFILER
+# ============================================================
+# Times each phase of the main loop (event pump, spawning, collisions,
+# drawing, ...) and keeps the last few hundred frames in a ring buffer.
+# A hotkey shows a live overlay with percentiles per phase, and the buffer
+# can be written to CSV when the game exits.
+#
+# The loop calls mark(phase) after each phase finishes; the time since the
+# previous mark is added to that phase. When the profiler is off, begin
+# and mark return straight away, so leaving the calls in costs next to
+# nothing.
+
+
+class FrameProfiler:
+    """
+    Per-phase frame timings in a fixed-size ring buffer
+    Args:
+        phases: phase names, in the order they run each frame
+        size: how many recent frames to keep
+        enabled: start recording straight away
+    """
+
+    def __init__(self, phases, size=600, enabled=False):
+        self.phases = list(phases)
+        self.index = {phase: i for i, phase in enumerate(self.phases)}
+        self.times = np.zeros((size, len(self.phases)))
+        self.frame = 0  # frames recorded so far (the ring position is frame % size)
+        self.enabled = enabled
+        self.row = self.times[0]
+        self.last = 0.0
+        self.font = None
+        self.overlay = None
+        self.overlay_frame = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if self.enabled:
+            # Start timing from here if switched on part way through a frame
+            self.row = self.times[self.frame % len(self.times)]
+            self.row[:] = 0
+            self.last = time.perf_counter()
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.row = self.times[self.frame % len(self.times)]
+        self.row[:] = 0
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """Add the time since the last mark to phase"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.row[self.index[phase]] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        if self.enabled:
+            self.frame += 1
+
+    def recorded(self):
+        """Timings of the frames in the buffer, oldest first, in seconds"""
+        size = len(self.times)
+        if self.frame <= size:
+            return self.times[:self.frame]
+        start = self.frame % size
+        return np.concatenate((self.times[start:], self.times[:start]))
+
+    def percentiles(self, q=(50, 95, 99)):
+        """Array of shape (phases + total, len(q)) in milliseconds"""
+        frames = self.recorded()
+        if len(frames) == 0:
+            return np.zeros((len(self.phases) + 1, len(q)))
+        with_total = np.column_stack((frames, frames.sum(axis=1)))
+        return np.percentile(with_total, q, axis=0).T * 1000.0
+
+    def draw_overlay(self, surface, pos=(10, 160), color=(255, 255, 255), refresh_frames=30):
+        """
+        Draw a p50/p95/p99 table (rebuilt every refresh_frames frames so the
+        overlay doesn't skew the numbers it shows). Returns the Rect covered.
+        """
+        if self.overlay is None or self.frame - self.overlay_frame >= refresh_frames:
+            self.overlay = self.render_overlay(color)
+            self.overlay_frame = self.frame
+        return surface.blit(self.overlay, pos)
+
+    def render_overlay(self, color):
+        if self.font is None:
+            self.font = pygame.font.SysFont("monospace", 14)
+        font = self.font
+        lines = [f"{'phase':13}{'p50':>7}{'p95':>7}{'p99':>7}  ms"]
+        for name, (p50, p95, p99) in zip(self.phases + ['total'], self.percentiles()):
+            lines.append(f"{name:13}{p50:7.2f}{p95:7.2f}{p99:7.2f}")
+        line_height = font.get_linesize()
+        width = max(font.size(line)[0] for line in lines) + 10
+        overlay = pygame.Surface((width, line_height * len(lines) + 10))
+        overlay.fill((0, 0, 0))
+        for i, line in enumerate(lines):
+            overlay.blit(font.render(line, True, color), (5, 5 + i * line_height))
+        return overlay
+
+    def export_csv(self, path):
+        """
+        Write the buffered frames (one row per frame, milliseconds) to a CSV file
+        Returns:
+            True if the file was written (a failed write is reported, not raised,
+            so quitting the game never ends in a traceback)
+        """
+        frames = self.recorded()
+        try:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame"] + self.phases + ["total"])
+                first = self.frame - len(frames)
+                for i, row in enumerate(frames):
+                    ms = [round(t * 1000.0, 4) for t in row]
+                    writer.writerow([first + i] + ms + [round(sum(ms), 4)])
+        except OSError as e:
+            print(f"Could not save frame profile: {e}")
+            return False
+        return True
@@ -0,0 +1,50 @@
+# ============================================================
+# FIXED TIMESTEP
+# ============================================================
+# The game logic runs in steps of a fixed length no matter how fast frames
+# are drawn. Real time piles up in an accumulator, and each frame runs as
+# many whole steps as fit in it. On a slow machine that means several
+# steps (and one render) per frame, so the game keeps its pace and the
+# spawn and difficulty curves don't drift.
+
+
+class FixedTimestep:
+    """
+    Accumulator that turns real frame times into fixed simulation steps
+    Args:
+        step_rate: simulation steps per second
+        max_steps: most steps to run in one frame; time beyond that is
+            dropped so a stall can't snowball into ever longer frames
+    """
+
+    def __init__(self, step_rate=60, max_steps=5):
+        self.step = 1.0 / step_rate
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+
+        # Counters, for checking how the machine is keeping up
+        self.steps_run = 0
+        self.frames_skipped = 0  # steps that had to share a frame with another step
+        self.time_dropped = 0.0
+
+    def reset(self):
+        """Forget pending time, e.g. when a run starts or is unpaused"""
+        self.accumulator = 0.0
+
+    def advance(self, dt):
+        """
+        Add dt seconds of real time
+        Returns:
+            how many simulation steps to run this frame
+        """
+        self.accumulator += dt
+        steps = int(self.accumulator / self.step)
+        if steps > self.max_steps:
+            self.time_dropped += (steps - self.max_steps) * self.step
+            self.accumulator -= (steps - self.max_steps) * self.step
+            steps = self.max_steps
+        self.accumulator -= steps * self.step
+        self.steps_run += steps
+        if steps > 1:
+            self.frames_skipped += steps - 1
+        return steps
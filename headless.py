@@ -0,0 +1,12 @@
+import os
+
+# ============================================================
+# HEADLESS MODE
+# ============================================================
+# Importing this module makes pygame run without a real window or sound
+# card, for the benchmark, balancer and vector environment. It has to be
+# imported before pygame starts, i.e. before pygame or either game module.
+# Drivers already chosen in the environment are left alone.
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
@@ -0,0 +1,217 @@
+import json
+import os
+import queue
+import threading
+import time
+
+# ============================================================
+# PLAYER PROFILE STORE
+# ============================================================
+# Keeps a player's high score, unlocked achievements, total play time and
+# a summary of every run between sessions. Three files sit side by side:
+#
+#   NAME.json     the summary: totals as of the last compaction. This is
+#                 all startup has to read (plus the short journal).
+#   NAME.journal  one JSON line per run since the summary was written.
+#                 Lines are only ever appended, and a line cut short by a
+#                 crash is skipped when the journal is read back.
+#   NAME.history  every run summary ever recorded, one JSON line each.
+#                 Nothing in the game reads it; it's there for players
+#                 (and balancing scripts) to look through.
+#
+# Every record carries a sequence number and the summary stores the last
+# one it includes, so if the game dies part way through a compaction the
+# records it already folded in are not counted twice on the next start
+# (the history may then hold a run twice, with the same sequence number).
+#
+# The game only ever touches the in-memory summary. Records are handed to
+# a background thread, which appends them in batches and fsyncs once per
+# batch, so a slow disk never holds up a frame.
+
+
+def apply_record(summary, record):
+    """Fold one run record into a summary dict (in place)"""
+    summary['seq'] = record['seq']
+    summary['runs'] += 1
+    summary['high_score'] = max(summary['high_score'], record['score'])
+    summary['play_time'] += record['time']
+    day = time.strftime("%Y-%m-%d", time.localtime(record['ended']))
+    if summary['day'] != day:
+        summary['day'] = day
+        summary['day_play_time'] = 0.0
+    summary['day_play_time'] += record['time']
+    for key in record['achievements']:
+        if key not in summary['achievements']:
+            summary['achievements'].append(key)
+
+
+def empty_summary():
+    return {'seq': 0, 'runs': 0, 'high_score': 0, 'play_time': 0.0,
+            'day': None, 'day_play_time': 0.0, 'achievements': []}
+
+
+class ProfileStore:
+    """
+    A player's saved progress
+    Args:
+        name: path of the profile without an extension (None = keep
+            everything in memory and never write)
+        compact_every: fold the journal into the summary after this many records
+        batch_delay: seconds the writer waits for more records before writing
+    """
+
+    def __init__(self, name, compact_every=50, batch_delay=0.5):
+        self.name = name
+        self.compact_every = compact_every
+        self.batch_delay = batch_delay
+        self.summary = empty_summary()
+        self.journal_records = 0  # records in the journal since the last compaction
+        self.queue = queue.Queue()
+        self.thread = None
+        if name is not None:
+            self._load()
+            self.thread = threading.Thread(target=self._writer, name="profile-writer", daemon=True)
+            self.thread.start()
+
+    # ---------------- Reading (main thread) ---------------- #
+
+    @property
+    def high_score(self):
+        return self.summary['high_score']
+
+    @property
+    def achievements(self):
+        """Keys of every achievement unlocked in any session"""
+        return list(self.summary['achievements'])
+
+    @property
+    def play_time(self):
+        """Seconds played in total"""
+        return self.summary['play_time']
+
+    def play_time_today(self):
+        """Seconds played today, for break reminders that span sessions"""
+        if self.summary['day'] != time.strftime("%Y-%m-%d"):
+            return 0.0
+        return self.summary['day_play_time']
+
+    def _load(self):
+        try:
+            with open(self.name + ".json") as f:
+                self.summary.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Could not read profile summary, starting fresh: {e}")
+        records, valid_bytes = self._read_journal()
+        for record in records:
+            if record['seq'] > self.summary['seq']:
+                apply_record(self.summary, record)
+                self.journal_records += 1
+        # Cut off a line torn by a crash, so the next append starts cleanly
+        try:
+            if os.path.getsize(self.name + ".journal") > valid_bytes:
+                os.truncate(self.name + ".journal", valid_bytes)
+        except OSError:
+            pass
+
+    def _read_journal(self):
+        """Returns the journal's complete records and how many bytes they take up"""
+        records = []
+        valid_bytes = 0
+        try:
+            with open(self.name + ".journal", "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete line")
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break  # torn write from a crash; nothing valid follows it
+                    valid_bytes += len(line)
+        except FileNotFoundError:
+            pass
+        return records, valid_bytes
+
+    # ---------------- Recording (main thread) ---------------- #
+
+    def record_run(self, edition, score, seconds, achievements=(), seed=None):
+        """
+        Add a finished run. The summary updates straight away; the write
+        happens on the background thread.
+        """
+        record = {'seq': self.summary['seq'] + 1, 'edition': edition, 'score': score,
+                  'time': round(seconds, 3), 'seed': seed, 'ended': time.time(),
+                  'achievements': list(achievements)}
+        apply_record(self.summary, record)
+        if self.thread is not None:
+            self.queue.put(record)
+
+    def close(self):
+        """Write everything still queued and stop the writer thread"""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    # ---------------- Writing (background thread) ---------------- #
+
+    def _writer(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            # Let a few more records arrive so they share one write and fsync
+            deadline = time.monotonic() + self.batch_delay
+            while batch[-1] is not None:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                batch.pop()
+                running = False
+            try:
+                if batch:
+                    self._append(batch)
+                if self.journal_records >= self.compact_every:
+                    self._compact()
+            except OSError as e:
+                print(f"Could not save profile: {e}")
+
+    def _append(self, records):
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        with open(self.name + ".journal", "a") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_records += len(records)
+
+    def _compact(self):
+        """Fold the journal into the summary and move its runs to the history"""
+        records, _ = self._read_journal()
+        if not records:
+            return
+        summary = empty_summary()
+        try:
+            with open(self.name + ".json") as f:
+                summary.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        fresh = [record for record in records if record['seq'] > summary['seq']]
+        for record in fresh:
+            apply_record(summary, record)
+
+        # History first, then the summary, then the journal: a crash between
+        # any two steps leaves files the next start reads correctly
+        with open(self.name + ".history", "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in fresh))
+            f.flush()
+            os.fsync(f.fileno())
+        temp = self.name + ".json.tmp"
+        with open(temp, "w") as f:
+            json.dump(summary, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.name + ".json")
+        open(self.name + ".journal", "w").close()
+        self.journal_records = 0
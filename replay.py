@@ -0,0 +1,156 @@
+import struct
+import sys
+import time
+
+# ============================================================
+# INPUT-LOG REPLAYS
+# ============================================================
+# Both editions run their game logic in fixed steps with a per-run seeded
+# random generator, so a run is fully decided by its seed and by whether
+# a jump was pressed on each step. A replay stores just that: a small
+# header and one bit per step (a minute of play is under 500 bytes).
+#
+# File layout (little-endian):
+#   magic "DSRP", format version (1 byte), edition (1 byte),
+#   steps per second (2 bytes), seed (8 bytes), step count (4 bytes),
+#   final score (4 bytes, -1 if unknown), then the jump bits, packed
+#   8 steps per byte, lowest bit first.
+#
+# Usage:
+#   python replay.py last_run_v2.dsr [more.dsr ...]
+
+MAGIC = b"DSRP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBBHQIi")
+
+
+class Recording:
+    """
+    Seed and per-step jump inputs for one run
+    Args:
+        edition: 1 for deep_sea_explorer, 2 for Chandrasekaran_deepseaexplorer_2
+        seed: the seed the run's GameState was created with
+        step_rate: logic steps per second the run used
+    """
+
+    def __init__(self, edition, seed, step_rate=60):
+        self.edition = edition
+        self.seed = seed
+        self.step_rate = step_rate
+        self.steps = 0
+        self.bits = bytearray()
+        self.final_score = -1
+
+    def record(self, jump):
+        """Add one step's input"""
+        if self.steps % 8 == 0:
+            self.bits.append(0)
+        if jump:
+            self.bits[-1] |= 1 << (self.steps % 8)
+        self.steps += 1
+
+    def inputs(self):
+        """Yield each step's jump input in order"""
+        bits = self.bits
+        for i in range(self.steps):
+            yield bool(bits[i >> 3] >> (i & 7) & 1)
+
+    def to_bytes(self):
+        return HEADER.pack(MAGIC, FORMAT_VERSION, self.edition, self.step_rate,
+                           self.seed, self.steps, self.final_score) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, edition, step_rate, seed, steps, final_score = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a Deep Sea replay file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported replay format version {version}")
+        recording = cls(edition, seed, step_rate)
+        recording.steps = steps
+        recording.bits = bytearray(data[HEADER.size:HEADER.size + (steps + 7) // 8])
+        recording.final_score = final_score
+        if len(recording.bits) * 8 < steps:
+            raise ValueError("replay file is truncated")
+        return recording
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def save_replay(recording, final_score, path):
+    """
+    Save a finished run so it can be replayed with replay.py
+    Args:
+        recording: the run's Recording
+        final_score: score the run ended with
+        path: file to write (None = don't save)
+    """
+    if path is None:
+        return
+    recording.final_score = final_score
+    try:
+        recording.save(path)
+    except OSError as e:
+        print(f"Could not save replay: {e}")
+
+
+def load_edition(edition):
+    """Import the game module a recording was made with"""
+    if edition == 1:
+        import deep_sea_explorer as game
+    elif edition == 2:
+        import Chandrasekaran_deepseaexplorer_2 as game
+    else:
+        raise ValueError(f"unknown edition {edition}")
+    return game
+
+
+def play_back(recording):
+    """
+    Re-run a recording headless, as fast as the CPU allows
+    Returns:
+        the GameState at the end of the recording
+    """
+    game = load_edition(recording.edition)
+    state = game.GameState(seed=recording.seed)
+    if recording.edition == 1:
+        for jump in recording.inputs():
+            game.update_game(state, jump)
+    else:
+        dt = 1.0 / recording.step_rate
+        for jump in recording.inputs():
+            game.step_game(state, jump, dt)
+    return state
+
+
+def main(paths):
+    if not paths:
+        print("Usage: python replay.py REPLAY_FILE [REPLAY_FILE ...]")
+        return 2
+    mismatches = 0
+    for path in paths:
+        recording = Recording.load(path)
+        load_edition(recording.edition)  # so the import isn't counted in the timing
+        start = time.perf_counter()
+        state = play_back(recording)
+        elapsed = time.perf_counter() - start
+        game_seconds = recording.steps / recording.step_rate
+        result = "ok"
+        if recording.final_score >= 0 and state.score != recording.final_score:
+            result = f"MISMATCH (recorded {recording.final_score})"
+            mismatches += 1
+        print(f"{path}: edition {recording.edition}, {recording.steps} steps, "
+              f"score {state.score} {result} - replayed {game_seconds:.1f}s of play "
+              f"in {elapsed:.3f}s ({game_seconds / max(elapsed, 1e-9):.0f}x real time)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,67 @@
+import pygame
+
+# ============================================================
+# SPRITE CACHE
+# ============================================================
+# Mines, jellyfish, coral and collectibles are built from several primitive
+# draw calls (and, for mines, some trigonometry). Their look only depends on
+# their type, size and color, so each look is drawn once onto a transparent
+# surface and every entity after that is a single blit.
+
+# Room left around an entity's collision box for parts drawn outside it
+# (mine spikes, jellyfish tentacles, coral tips)
+SPRITE_PADDING = 64
+
+
+class SpriteCache:
+    """Pre-rendered per-pixel-alpha sprites keyed by (class, type, size, color)"""
+
+    def __init__(self):
+        self.sprites = {}
+
+    def key(self, entity):
+        size = getattr(entity, 'size', None)
+        if size is None:
+            size = (entity.width, entity.height)
+        return (type(entity), entity.type, size, getattr(entity, 'color', None))
+
+    def get(self, entity):
+        """
+        Get the sprite for an entity, rendering it the first time
+        Returns:
+            (surface, dx, dy) where (dx, dy) is the sprite's top-left corner
+            relative to the entity's (x, y)
+        """
+        key = self.key(entity)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.render(entity)
+            self.sprites[key] = sprite
+        return sprite
+
+    def render(self, entity):
+        """Draw an entity with its own draw() onto a transparent surface and crop it"""
+        old_x, old_y = entity.x, entity.y
+        entity.x = entity.y = 0
+        box = entity.get_rect()
+
+        # Put the entity where its collision box sits at (padding, padding)
+        anchor_x = SPRITE_PADDING - box.x
+        anchor_y = SPRITE_PADDING - box.y
+        canvas = pygame.Surface((box.width + 2 * SPRITE_PADDING, box.height + 2 * SPRITE_PADDING),
+                                pygame.SRCALPHA)
+        entity.x, entity.y = anchor_x, anchor_y
+        entity.draw(canvas)
+        entity.x, entity.y = old_x, old_y
+
+        bounds = canvas.get_bounding_rect()
+        sprite = canvas.subsurface(bounds).copy()
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert_alpha()
+        return sprite, bounds.x - anchor_x, bounds.y - anchor_y
+
+    def clear(self):
+        self.sprites.clear()
+
+
+sprite_cache = SpriteCache()
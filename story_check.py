@@ -0,0 +1,162 @@
+import importlib
+import sys
+from collections import deque
+
+from story_engine import compile_story
+from story_pack import PackedStory
+
+# ============================================================
+# STORY CHECKER
+# ============================================================
+# Checks a story without playing it. For every ending it counts how many
+# different choice sequences lead there and which values the story
+# variables (e.g. friends_made) can have on arrival, and it lists
+# passages no path reaches and dead ends (reachable passages from which
+# no ending can be reached).
+#
+# Counting paths one by one grows exponentially with the story's depth.
+# Here each node's count is the sum of its parents' counts, worked out
+# once per node in topological order, so the whole check is linear in the
+# number of nodes and choices (times the number of distinct variable
+# states, which is small for stories that only count things). Paths
+# through a loop are reported as unbounded.
+#
+# Usage:
+#   python story_check.py [MODULE[:VARIABLE] | FILE.pack]   (default CHOOSE_YOUR_ADVENTURE:STORY)
+# Exits with status 1 if there are unreachable passages or dead ends.
+
+UNBOUNDED = float("inf")
+
+
+def reachable_from(starts, edges):
+    """Every node reachable from starts by following edges (node -> list of nodes)"""
+    seen = set(starts)
+    queue = deque(starts)
+    while queue:
+        node = queue.popleft()
+        for target in edges[node]:
+            if target not in seen:
+                seen.add(target)
+                queue.append(target)
+    return seen
+
+
+def analyze(story):
+    """
+    Work out paths, reachable states, unreachable passages and dead ends
+    Args:
+        story: compiled Story
+    Returns:
+        dict with 'paths' and 'states' (node -> value, for every reachable
+        node), 'endings', 'unreachable' and 'dead_ends' (lists of node numbers)
+    """
+    n = len(story)
+    forward = [[target for _, target in story.choices(node)] for node in range(n)]
+    backward = [[] for _ in range(n)]
+    for node, targets in enumerate(forward):
+        for target in targets:
+            backward[target].append(node)
+
+    reachable = reachable_from([story.start], forward)
+    endings = [node for node in range(n) if story.ending(node) is not None]
+    can_finish = reachable_from(endings, backward)
+    unreachable = [node for node in range(n) if node not in reachable]
+    dead_ends = [node for node in range(n) if node in reachable and node not in can_finish]
+
+    # Kahn's algorithm over the reachable part. Nodes it never gets to are
+    # on a loop or after one, so they have unboundedly many paths.
+    indegree = {node: 0 for node in reachable}
+    for node in reachable:
+        for target in forward[node]:
+            indegree[target] += 1
+    variables = list(story.variables)
+    start_state = arrive(story, story.start, tuple(story.variables[v] for v in variables), variables)
+    paths = {node: 0 for node in reachable}
+    states = {node: set() for node in reachable}
+    paths[story.start] = 1
+    states[story.start].add(start_state)
+    ready = deque(node for node in reachable if indegree[node] == 0)
+    done = set()
+    while ready:
+        node = ready.popleft()
+        done.add(node)
+        for target in forward[node]:
+            paths[target] += paths[node]
+            for state in states[node]:
+                states[target].add(arrive(story, target, state, variables))
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                ready.append(target)
+    for node in reachable:
+        if node not in done:
+            paths[node] = UNBOUNDED
+            states[node] = None  # depends on how many times the loop is taken
+
+    return {'paths': paths, 'states': states, 'variables': variables, 'endings': endings,
+            'unreachable': unreachable, 'dead_ends': dead_ends}
+
+
+def arrive(story, node, state, variables):
+    """Variable values after arriving at node with state (a tuple in variables order)"""
+    effects = story.effects(node)
+    if not effects:
+        return state
+    values = list(state)
+    for var, amount in effects:
+        values[variables.index(var)] += amount
+    return tuple(values)
+
+
+def describe_states(states, variables):
+    if states is None:
+        return "unbounded"
+    if not variables:
+        return "-"
+    return "  ".join(f"{var}: {', '.join(str(value) for value in sorted({state[i] for state in states}))}"
+                     for i, var in enumerate(variables))
+
+
+def report(story, result):
+    paths = result['paths']
+    endings = result['endings']
+    choices = sum(len(story.choices(node)) for node in range(len(story)))
+    print(f"{len(story)} passages, {choices} choices, {len(endings)} endings")
+    print()
+    print("Endings:")
+    width = max((len(story.name(node)) for node in endings), default=0)
+    total = 0
+    for node in endings:
+        kind = "win" if story.ending(node) else "try again"
+        count = paths.get(node, 0)
+        total += count
+        shown = "unbounded" if count == UNBOUNDED else str(count)
+        states = describe_states(result['states'].get(node, set()), result['variables'])
+        print(f"  {story.name(node):{width}}  {kind:9}  paths {shown:>6}  {states}")
+    print(f"Paths to an ending: {'unbounded' if total == UNBOUNDED else total}")
+    print()
+    print("Unreachable passages: " + (", ".join(story.name(node) for node in result['unreachable']) or "none"))
+    print("Dead ends: " + (", ".join(story.name(node) for node in result['dead_ends']) or "none"))
+
+
+def load(spec):
+    """
+    'module:VARIABLE' (or just 'module', for its STORY) -> compiled Story,
+    or a story pack's path -> PackedStory
+    """
+    if spec.endswith(".pack"):
+        return PackedStory(spec)
+    module_name, _, variable = spec.partition(":")
+    module = importlib.import_module(module_name)
+    return compile_story(getattr(module, variable or "STORY"))
+
+
+def main(argv):
+    spec = argv[0] if argv else "CHOOSE_YOUR_ADVENTURE:STORY"
+    story = load(spec)
+    result = analyze(story)
+    report(story, result)
+    return 1 if result['unreachable'] or result['dead_ends'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,178 @@
+import zlib
+from string import Formatter
+
+# ============================================================
+# STORY ENGINE
+# ============================================================
+# A choose-your-own-adventure story is a graph of named nodes. Each node
+# has a passage of text and either a list of choices (label + the node it
+# leads to) or an ending (a win or a try-again). Arriving at a node can
+# change the story's variables, e.g. {'friends_made': 1} adds one friend.
+#
+# Stories are written as plain dicts:
+#
+#   STORY = {
+#       'start': 'first_node',
+#       'constants': {'dolphin_name': 'Splash'},   # fixed names for the text
+#       'variables': {'friends_made': 0},          # starting values
+#       'nodes': {
+#           'first_node': {
+#               'text': "Hello {player_name}! ...",
+#               'choices': [("Ask {dolphin_name}", 'dolphin'), ...],
+#           },
+#           'dolphin': {
+#               'effects': {'friends_made': 1},
+#               'text': "...",
+#               'ending': True,   # True = win, False = try again
+#           },
+#       },
+#   }
+#
+# compile_story() checks the dict once and turns it into a Story: nodes
+# numbered 0..n-1 with their text, choices, effects and endings in lists
+# indexed by number, so playing a step costs the same however big the
+# story is. A Session plays one reader's way through a Story.
+
+
+class Story:
+    """
+    A compiled story. Nodes are numbered; each per-node list is indexed by
+    node number, and choice targets are node numbers too.
+    """
+
+    def __init__(self, names, texts, choices, effects, endings, start, constants, variables):
+        self.names = names           # node number -> name in the source dict
+        self.index = {name: i for i, name in enumerate(names)}
+        self.node_texts = texts      # passage text (format string)
+        self.node_choices = choices  # tuple of (label, target node number)
+        self.node_effects = effects  # tuple of (variable, amount added on arrival)
+        self.node_endings = endings  # None, or True/False for a win/try-again ending
+        self.start = start
+        self.constants = constants
+        self.variables = variables  # starting values
+        self.fingerprint = fingerprint(names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def name(self, node):
+        return self.names[node]
+
+    def text(self, node):
+        return self.node_texts[node]
+
+    def choices(self, node):
+        return self.node_choices[node]
+
+    def effects(self, node):
+        return self.node_effects[node]
+
+    def ending(self, node):
+        return self.node_endings[node]
+
+
+def fingerprint(names):
+    """CRC of the node names, for telling versions of a story apart"""
+    return zlib.crc32("\0".join(names).encode("utf-8"))
+
+
+def format_fields(text):
+    """Names of the {fields} used in a passage or label"""
+    return {field for _, field, _, _ in Formatter().parse(text) if field}
+
+
+def compile_story(story):
+    """
+    Check a story dict and build its Story
+    Raises:
+        ValueError: if a choice leads nowhere or a passage uses an unknown name
+    """
+    nodes = story['nodes']
+    names = list(nodes)
+    index = {name: i for i, name in enumerate(names)}
+    constants = dict(story.get('constants', {}))
+    variables = dict(story.get('variables', {}))
+    known = set(constants) | set(variables) | {'player_name'}
+    if story['start'] not in index:
+        raise ValueError(f"start node '{story['start']}' is not in the story")
+
+    texts, choices, effects, endings = [], [], [], []
+    for name in names:
+        node = nodes[name]
+        text = node.get('text', '')
+        node_choices = []
+        for label, target in node.get('choices', ()):
+            if target not in index:
+                raise ValueError(f"node '{name}': choice '{label}' leads to unknown node '{target}'")
+            node_choices.append((label, index[target]))
+        for var in node.get('effects', {}):
+            if var not in variables:
+                raise ValueError(f"node '{name}': effect on unknown variable '{var}'")
+        for part in [text] + [label for label, _ in node_choices]:
+            unknown = format_fields(part) - known
+            if unknown:
+                raise ValueError(f"node '{name}': unknown name(s) {', '.join(sorted(unknown))}")
+        ending = node.get('ending')
+        if ending is not None and node_choices:
+            raise ValueError(f"node '{name}' is an ending but also has choices")
+
+        texts.append(text)
+        choices.append(tuple(node_choices))
+        effects.append(tuple(node.get('effects', {}).items()))
+        endings.append(None if ending is None else bool(ending))
+
+    return Story(names, texts, choices, effects, endings, index[story['start']], constants, variables)
+
+
+class Session:
+    """
+    One reader's place in a story
+    Args:
+        story: compiled Story
+        player_name: name to use in the text
+        node, variables, history: where to pick up from (all None = start
+            at the beginning). history is the list of choice numbers made.
+    """
+
+    def __init__(self, story, player_name, node=None, variables=None, history=None):
+        self.story = story
+        self.player_name = player_name
+        self.history = list(history) if history else []
+        if node is None:
+            self.variables = dict(story.variables)
+            self.goto(story.start)
+        else:
+            self.node = node
+            self.variables = dict(variables)
+
+    def goto(self, node):
+        """Arrive at a node and apply its effects"""
+        self.node = node
+        for var, amount in self.story.effects(node):
+            self.variables[var] += amount
+
+    def context(self):
+        context = dict(self.story.constants)
+        context.update(self.variables)
+        context['player_name'] = self.player_name
+        return context
+
+    def passage(self):
+        """The current node's text, with names and variables filled in"""
+        return self.story.text(self.node).format_map(self.context())
+
+    def options(self):
+        """Labels of the current node's choices, in order"""
+        context = self.context()
+        return [label.format_map(context) for label, _ in self.story.choices(self.node)]
+
+    @property
+    def ending(self):
+        """None while the story goes on, else True for a win and False for a try-again"""
+        return self.story.ending(self.node)
+
+    def choose(self, number):
+        """Take choice number (1-based) and move to the node it leads to"""
+        _, target = self.story.choices(self.node)[number - 1]
+        self.history.append(number)
+        self.goto(target)
@@ -0,0 +1,196 @@
+import argparse
+import mmap
+import struct
+import sys
+
+# ============================================================
+# STORY PACKS
+# ============================================================
+# A story pack is a compiled story in one binary file. The game opens it
+# with mmap and reads a node's text only when a player reaches that node,
+# so opening a pack costs the same for a one-page story as for a whole
+# book, and only the pages actually visited are ever read from disk.
+#
+# File layout (little-endian):
+#   header      magic "ADVP", format version, then the counts and the
+#               offsets of each section below (see HEADER)
+#   strings     every distinct piece of text once (node names, passages,
+#               choice labels, variable and character names), as an index
+#               of (offset, length) pairs followed by the UTF-8 bytes
+#   nodes       one fixed-size record per node (see NODE), so node n is
+#               found by arithmetic: name and text string numbers, where
+#               its choices and effects start, how many there are, and
+#               its ending (0 = none, 1 = try again, 2 = win)
+#   links       per node, its choices as (label string, target node)
+#               followed by its effects as (variable string, amount)
+#   globals     constants as (name string, value string) and variables
+#               as (name string, starting value)
+#
+# Usage:
+#   python story_pack.py build OUT.pack [MODULE[:VARIABLE]]   (default CHOOSE_YOUR_ADVENTURE:STORY)
+#   python story_pack.py info FILE.pack
+
+MAGIC = b"ADVP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sB3xIIIIII" + "IIIII")
+NODE = struct.Struct("<IIIHHB3x")
+STRING = struct.Struct("<II")
+PAIR = struct.Struct("<Ii")
+ENDING_CODES = {None: 0, False: 1, True: 2}
+ENDINGS = {0: None, 1: False, 2: True}
+
+
+# ---------------- Building ---------------- #
+
+def build_pack(story, path):
+    """Write a compiled Story (or PackedStory) to path as a story pack"""
+    strings = {}
+
+    def intern(text):
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    nodes = bytearray()
+    links = bytearray()
+    for node in range(len(story)):
+        choices = story.choices(node)
+        effects = story.effects(node)
+        nodes += NODE.pack(intern(story.name(node)), intern(story.text(node)), len(links),
+                           len(choices), len(effects), ENDING_CODES[story.ending(node)])
+        for label, target in choices:
+            links += PAIR.pack(intern(label), target)
+        for var, amount in effects:
+            links += PAIR.pack(intern(var), amount)
+
+    globals_ = bytearray()
+    for name, value in story.constants.items():
+        globals_ += STRING.pack(intern(name), intern(str(value)))
+    for name, value in story.variables.items():
+        globals_ += PAIR.pack(intern(name), value)
+
+    index = bytearray()
+    blob = bytearray()
+    for text in strings:  # dicts keep insertion order, which is string number order
+        data = text.encode("utf-8")
+        index += STRING.pack(len(blob), len(data))
+        blob += data
+
+    index_offset = HEADER.size
+    blob_offset = index_offset + len(index)
+    nodes_offset = blob_offset + len(blob)
+    links_offset = nodes_offset + len(nodes)
+    globals_offset = links_offset + len(links)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(story), story.start, story.fingerprint,
+                         len(strings), len(story.constants), len(story.variables),
+                         index_offset, blob_offset, nodes_offset, links_offset, globals_offset)
+    with open(path, "wb") as f:
+        for part in (header, index, blob, nodes, links, globals_):
+            f.write(part)
+
+
+# ---------------- Reading ---------------- #
+
+class PackedStory:
+    """
+    A story pack opened for playing. Has the same methods as
+    story_engine.Story, so Sessions, saves and the checker work with either.
+    Args:
+        path: the .pack file
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.node_count, self.start, self.fingerprint, self.string_count,
+         constant_count, variable_count, self.index_offset, self.blob_offset, self.nodes_offset,
+         self.links_offset, globals_offset) = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError("not a story pack")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported story pack version {version}")
+
+        # Names for the text and starting values are small; read them now
+        offset = globals_offset
+        self.constants = {}
+        for _ in range(constant_count):
+            name, value = STRING.unpack_from(self.data, offset)
+            self.constants[self.string(name)] = self.string(value)
+            offset += STRING.size
+        self.variables = {}
+        for _ in range(variable_count):
+            name, value = PAIR.unpack_from(self.data, offset)
+            self.variables[self.string(name)] = value
+            offset += PAIR.size
+
+    def close(self):
+        self.data.close()
+
+    def string(self, number):
+        offset, length = STRING.unpack_from(self.data, self.index_offset + number * STRING.size)
+        start = self.blob_offset + offset
+        return self.data[start:start + length].decode("utf-8")
+
+    def _node(self, node):
+        if not 0 <= node < self.node_count:
+            raise IndexError(f"node {node} is not in the story")
+        return NODE.unpack_from(self.data, self.nodes_offset + node * NODE.size)
+
+    def __len__(self):
+        return self.node_count
+
+    def name(self, node):
+        return self.string(self._node(node)[0])
+
+    def text(self, node):
+        return self.string(self._node(node)[1])
+
+    def choices(self, node):
+        _, _, links, choice_count, _, _ = self._node(node)
+        offset = self.links_offset + links
+        choices = []
+        for i in range(choice_count):
+            label, target = PAIR.unpack_from(self.data, offset + i * PAIR.size)
+            choices.append((self.string(label), target))
+        return tuple(choices)
+
+    def effects(self, node):
+        _, _, links, choice_count, effect_count, _ = self._node(node)
+        offset = self.links_offset + links + choice_count * PAIR.size
+        effects = []
+        for i in range(effect_count):
+            var, amount = PAIR.unpack_from(self.data, offset + i * PAIR.size)
+            effects.append((self.string(var), amount))
+        return tuple(effects)
+
+    def ending(self, node):
+        return ENDINGS[self._node(node)[5]]
+
+
+# ---------------- Command line ---------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect adventure story packs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a story into a pack")
+    build.add_argument("output")
+    build.add_argument("story", nargs="?", default="CHOOSE_YOUR_ADVENTURE:STORY", help="MODULE[:VARIABLE]")
+    info = commands.add_parser("info", help="show what is in a pack")
+    info.add_argument("pack")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        from story_check import load
+        story = load(args.story)
+        build_pack(story, args.output)
+        print(f"Wrote {len(story)} nodes to {args.output}")
+    else:
+        story = PackedStory(args.pack)
+        print(f"{args.pack}: {len(story)} nodes, {story.string_count} distinct strings, "
+              f"{len(story.data)} bytes, start '{story.name(story.start)}'")
+        story.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
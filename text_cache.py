@@ -0,0 +1,113 @@
+from collections import OrderedDict
+
+import pygame
+
+# ============================================================
+# TEXT CACHE
+# ============================================================
+# The HUD redraws the same few strings every frame, and the numbers in them
+# only change by a digit or two. Whole strings are kept in a small LRU so a
+# label is only rendered once, and numbers are put together from a digit
+# atlas: one render of "0123456789..." per font and color, sliced into
+# per-character pieces. A score going from 1234 to 1239 is pieced together
+# from cached glyphs instead of a TrueType render, and a value that did not
+# change since last frame is a single blit of the cached result.
+
+ATLAS_CHARS = "0123456789.,-+:%x"
+
+
+class TextCache:
+    """
+    Cached font rendering for per-frame text
+    Args:
+        max_strings: how many rendered strings to keep (least recently used go first)
+    """
+
+    def __init__(self, max_strings=256):
+        self.max_strings = max_strings
+        self.strings = OrderedDict()
+        self.atlases = {}
+
+    def render(self, font, text, color):
+        """Same as font.render(text, True, color), but cached"""
+        key = (font, text, color)
+        surface = self.strings.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.strings[key] = surface
+            if len(self.strings) > self.max_strings:
+                self.strings.popitem(last=False)
+        else:
+            self.strings.move_to_end(key)
+        return surface
+
+    def draw(self, surface, font, text, color, pos):
+        """Blit cached text with its top-left at pos. Returns the Rect drawn."""
+        return surface.blit(self.render(font, text, color), pos)
+
+    def get_atlas(self, font, color):
+        """Glyph surfaces for ATLAS_CHARS, cut out of a single render"""
+        key = (font, color)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            strip = font.render(ATLAS_CHARS, True, color)
+            height = strip.get_height()
+            atlas = {}
+            for i, char in enumerate(ATLAS_CHARS):
+                left = font.size(ATLAS_CHARS[:i])[0]
+                right = min(font.size(ATLAS_CHARS[:i + 1])[0], strip.get_width())
+                atlas[char] = strip.subsurface((left, 0, right - left, height))
+            self.atlases[key] = atlas
+        return atlas
+
+    def render_number(self, font, label, number, color, suffix=""):
+        """
+        Surface for label + number + suffix, e.g. "Score: " + "1234"
+        Args:
+            label, suffix: fixed text, rendered once and cached
+            number: the changing part, already formatted (e.g. f"{speed:.1f}")
+        Returns:
+            a cached surface; a new value is pieced together from the digit
+            atlas and the cached label instead of being rendered by the font
+        """
+        key = (font, label + number + suffix, color)
+        surface = self.strings.get(key)
+        if surface is not None:
+            self.strings.move_to_end(key)
+            return surface
+
+        atlas = self.get_atlas(font, color)
+        if any(char not in atlas for char in number):
+            return self.render(font, label + number + suffix, color)
+
+        pieces = [self.render(font, label, color)] if label else []
+        pieces += [atlas[char] for char in number]
+        if suffix:
+            pieces.append(self.render(font, suffix, color))
+        width = sum(piece.get_width() for piece in pieces)
+        height = max(piece.get_height() for piece in pieces)
+
+        # Adding onto a fully transparent surface copies each piece's pixels
+        # and alpha exactly (a normal alpha blit would darken the edges)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 0))
+        x = 0
+        for piece in pieces:
+            surface.blit(piece, (x, 0), special_flags=pygame.BLEND_RGBA_ADD)
+            x += piece.get_width()
+
+        self.strings[key] = surface
+        if len(self.strings) > self.max_strings:
+            self.strings.popitem(last=False)
+        return surface
+
+    def draw_number(self, surface, font, label, number, color, pos, suffix=""):
+        """Blit render_number() with its top-left at pos. Returns the Rect drawn."""
+        return surface.blit(self.render_number(font, label, number, color, suffix), pos)
+
+    def clear(self):
+        self.strings.clear()
+        self.atlases.clear()
+
+
+text_cache = TextCache()
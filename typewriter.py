@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+
+try:
+    import termios
+    import tty
+    import select
+except ImportError:  # Windows
+    termios = None
+    import msvcrt
+
+# ============================================================
+# TYPEWRITER OUTPUT
+# ============================================================
+# Prints text a little at a time, like someone typing it. Instead of one
+# write, flush and sleep per character, the text goes out in chunks
+# (about chunk_interval seconds' worth each) timed against a clock, so a
+# slow terminal gets a few writes a second and the overall speed still
+# matches the chosen characters-per-second rate.
+#
+# Pressing any key while a passage is typing prints the rest of it at
+# once. When output isn't a terminal (a pipe, a file, a test) everything
+# is written straight away.
+
+
+def paced_chunks(text, cps, chunk_interval=0.05):
+    """
+    Split text into chunks for typing at cps characters per second
+    Yields:
+        (chunk, seconds after the start at which to write it)
+    """
+    size = max(1, round(cps * chunk_interval))
+    for start in range(0, len(text), size):
+        yield text[start:start + size], start / cps
+
+
+class KeyWatcher:
+    """
+    Context manager that notices keypresses on the terminal without waiting
+    for Enter. Does nothing (never sees a key) if stdin isn't a terminal.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdin
+        self.active = False
+        self.saved = None
+
+    def __enter__(self):
+        try:
+            self.active = self.stream.isatty()
+        except (AttributeError, ValueError):
+            self.active = False
+        if self.active and termios is not None:
+            fd = self.stream.fileno()
+            self.saved = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        return self
+
+    def __exit__(self, *exc):
+        if self.saved is not None:
+            termios.tcsetattr(self.stream.fileno(), termios.TCSADRAIN, self.saved)
+            self.saved = None
+
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds for a keypress
+        Returns:
+            True if a key was pressed (the keys are used up, so they don't
+            end up in the next input())
+        """
+        if timeout < 0:
+            timeout = 0
+        if not self.active:
+            time.sleep(timeout)
+            return False
+        if termios is not None:
+            fd = self.stream.fileno()
+            if not select.select([fd], [], [], timeout)[0]:
+                return False
+            while select.select([fd], [], [], 0)[0]:
+                os.read(fd, 1024)
+            return True
+        deadline = time.monotonic() + timeout
+        while not msvcrt.kbhit():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        while msvcrt.kbhit():
+            msvcrt.getwch()
+        return True
+
+
+class Typewriter:
+    """
+    Typing-effect printer
+    Args:
+        cps: characters per second
+        chunk_interval: seconds between writes
+        stream: where to write (default sys.stdout)
+        instant: True to always print at once, False to always type,
+            None to type only when stream is a terminal
+    """
+
+    def __init__(self, cps=33, chunk_interval=0.05, stream=None, instant=None):
+        self.cps = cps
+        self.chunk_interval = chunk_interval
+        self.stream = stream
+        self.instant = instant
+
+    def is_instant(self, stream):
+        if self.instant is not None:
+            return self.instant
+        try:
+            return not stream.isatty()
+        except (AttributeError, ValueError):
+            return True
+
+    def write(self, text, cps=None, end="\n"):
+        """Type text, then end. A keypress finishes the passage at once."""
+        stream = self.stream or sys.stdout
+        cps = cps or self.cps
+        if not text or self.is_instant(stream):
+            stream.write(text + end)
+            stream.flush()
+            return
+
+        start = time.monotonic()
+        with KeyWatcher() as keys:
+            written = 0
+            for chunk, due in paced_chunks(text, cps, self.chunk_interval):
+                if due and keys.wait(start + due - time.monotonic()):
+                    stream.write(text[written:])
+                    break
+                stream.write(chunk)
+                stream.flush()
+                written += len(chunk)
+        stream.write(end)
+        stream.flush()
@@ -0,0 +1,263 @@
+import sys
+import time
+
+import headless  # no window or sound card; must come before pygame
+
+import numpy as np
+
+import Chandrasekaran_deepseaexplorer_2 as game
+from entity_store import origin_box
+
+# ============================================================
+# VECTOR ENVIRONMENT
+# ============================================================
+# Runs many independent games of the v2 rules side by side for training
+# and evaluating autopilots. Every piece of state is a NumPy array with one
+# row per game: the submarine's y and velocity, the clock and score, and a
+# fixed number of entity slots per game for collectibles and obstacles. A
+# step moves all games at once with whole-array operations, so the cost per
+# step barely depends on how many games there are.
+#
+# The rules (gravity, jump, speed/spawn/difficulty curves, collision boxes,
+# point values) are read from Chandrasekaran_deepseaexplorer_2 when the
+# environment is created. Random numbers come from one NumPy generator, so
+# a game here plays the same way as step_game but not the same run as the
+# GameState with the same seed.
+#
+# Usage:
+#   python vector_env.py [NUM_ENVS]   time random-action steps on this machine
+
+
+class VectorEnv:
+    """
+    num_envs Deep Sea games stepped in lockstep
+    Args:
+        num_envs: number of games
+        seed: seed for the shared random generator (None = random)
+        slots: entity slots per game for each of collectibles and obstacles
+            (a spawn with no free slot is skipped, like a governed spawn)
+        nearest: how many of the nearest obstacles/collectibles ahead of the
+            submarine to put in each observation
+        max_time: end a game after this many seconds even if alive (None = never)
+        crash_penalty: subtracted from the reward on the step a game crashes
+    """
+
+    def __init__(self, num_envs, seed=None, slots=40, nearest=3, max_time=None, crash_penalty=0.0):
+        self.num_envs = n = num_envs
+        self.slots = slots
+        self.nearest = nearest
+        self.max_time = max_time
+        self.crash_penalty = crash_penalty
+        self.rng = np.random.default_rng(seed)
+
+        # Rules, read once from the game module
+        self.dt = 1.0 / game.STEP_RATE
+        self.width, self.height = game.WIDTH, game.HEIGHT
+        sub = game.Submarine()
+        self.sub_x, self.sub_w, self.sub_h = sub.x, sub.width, sub.height
+        self.gravity = game.GRAVITY
+        self.jump_strength = game.JUMP_STRENGTH
+        self.base_speed = game.BASE_SPEED
+        self.max_speed = game.MAX_SPEED
+        self.difficulty_base = game.DIFFICULTY_MULTIPLIER
+        self.base_spawn_rate = game.BASE_SPAWN_RATE
+        self.spawn_base = game.SPAWN_MULTIPLIER
+
+        # Per-type collision boxes (offset x, offset y, width, height) and
+        # values, taken from the prototypes like EntityTable does
+        self.collectible_box = self._boxes(game.COLLECTIBLE_PROTOTYPES)
+        self.obstacle_box = self._boxes(game.OBSTACLE_PROTOTYPES)
+        self.collectible_value = np.array([p.value for p in game.COLLECTIBLE_PROTOTYPES], dtype=np.int64)
+        # step_game picks from ['pearl', 'pearl', 'coin', 'coin', 'coin', 'treasure']
+        weights = np.array([2.0, 3.0, 1.0])
+        self.collectible_weights = np.cumsum(weights / weights.sum())
+
+        # Game state, one row per game
+        self.y = np.zeros(n)
+        self.velocity = np.zeros(n)
+        self.time = np.zeros(n)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.collectibles = self._slots(n, slots)
+        self.obstacles = self._slots(n, slots)
+        self.cx, self.cy, self.ctype, self.calive = (self.collectibles[c] for c in ('x', 'y', 'type', 'alive'))
+        self.ox, self.oy, self.otype, self.oalive = (self.obstacles[c] for c in ('x', 'y', 'type', 'alive'))
+
+        self.observation_size = 3 + 2 * nearest + 3 * nearest
+
+    @staticmethod
+    def _slots(n, slots):
+        """
+        Columns for one kind of entity. Entities never move vertically, so
+        the top and bottom of each box are worked out once, at spawn.
+        """
+        columns = {name: np.zeros((n, slots)) for name in ('x', 'y', 'box_dx', 'box_w', 'top', 'bottom', 'value')}
+        columns['type'] = np.zeros((n, slots), dtype=np.int64)
+        columns['alive'] = np.zeros((n, slots), dtype=bool)
+        return columns
+
+    @staticmethod
+    def _boxes(prototypes):
+        return np.array([origin_box(p) for p in prototypes], dtype=np.float64)
+
+    # ---------------- API ---------------- #
+
+    def reset(self):
+        """Start every game over. Returns the observations."""
+        self._reset_games(np.ones(self.num_envs, dtype=bool))
+        return self.observe()
+
+    def step(self, jumps):
+        """
+        Advance every game by one step
+        Args:
+            jumps: array of num_envs bools, True to jump
+        Returns:
+            (observations, rewards, dones, info). Games that ended are reset
+            straight away, so their observation is the new game's first;
+            info holds the ended games' final 'score' and 'time' (0 for
+            games still running) and whether they were 'truncated' by max_time.
+        """
+        jumps = np.asarray(jumps, dtype=bool)
+        dt = self.dt
+        rng = self.rng
+
+        # Submarine
+        self.velocity[jumps] = self.jump_strength
+        self.time += dt
+        t = self.time
+        difficulty = self.difficulty_base ** t
+        speed = np.minimum(self.base_speed * difficulty, self.max_speed)
+        spawn_rate = self.base_spawn_rate * self.spawn_base ** t
+
+        self.velocity += self.gravity
+        self.y += self.velocity
+        bottom = self.height - self.sub_h
+        stopped = (self.y < 0) | (self.y > bottom)
+        np.clip(self.y, 0, bottom, out=self.y)
+        self.velocity[stopped] = 0
+
+        # Spawning (at most one of each kind per game per step)
+        spawn = rng.random(self.num_envs) < spawn_rate * 0.6
+        types = np.searchsorted(self.collectible_weights, rng.random(self.num_envs), 'right')
+        self._spawn(spawn, types, self.collectibles, self.collectible_box, self.collectible_value)
+        spawn = rng.random(self.num_envs) < spawn_rate * difficulty * 0.4
+        types = rng.integers(0, len(self.obstacle_box), self.num_envs)
+        self._spawn(spawn, types, self.obstacles, self.obstacle_box)
+
+        # Scrolling and culling
+        step = speed[:, None]
+        self.cx -= step
+        self.ox -= step
+        self.calive &= self.cx >= -50
+        self.oalive &= self.ox >= -50
+
+        # Collisions (Rects truncate floats, so trunc everything like pygame)
+        top = np.trunc(self.y)[:, None]
+        hits = self.calive & self._overlap(self.collectibles, top)
+        points = (self.collectibles['value'] * hits).sum(axis=1).astype(np.int64)
+        self.calive &= ~hits
+        self.score += points
+        crashed = (self.oalive & self._overlap(self.obstacles, top)).any(axis=1)
+
+        rewards = points.astype(np.float64)
+        rewards[crashed] -= self.crash_penalty
+        truncated = ~crashed & (t >= self.max_time) if self.max_time is not None else np.zeros_like(crashed)
+        dones = crashed | truncated
+        info = {'score': np.where(dones, self.score, 0), 'time': np.where(dones, t, 0.0),
+                'truncated': truncated}
+        if dones.any():
+            self._reset_games(dones)
+        return self.observe(), rewards, dones, info
+
+    def observe(self):
+        """
+        Observations as a float32 array of shape (num_envs, observation_size):
+        submarine y, velocity and scroll speed, then (dx, dy) to the nearest
+        obstacles ahead and (dx, dy, value) to the nearest collectibles
+        ahead, nearest first. Distances are divided by the screen size, and
+        missing entities are reported as (1, 0[, 0]).
+        """
+        n, k = self.num_envs, self.nearest
+        obs = np.zeros((n, self.observation_size), dtype=np.float32)
+        speed = np.minimum(self.base_speed * self.difficulty_base ** self.time, self.max_speed)
+        obs[:, 0] = self.y / self.height
+        obs[:, 1] = self.velocity / abs(self.jump_strength)
+        obs[:, 2] = speed / self.max_speed
+        sub_y = (self.y + self.sub_h / 2)[:, None]
+
+        dx, dy, _ = self._nearest(self.ox, self.oy, self.oalive, sub_y)
+        obs[:, 3:3 + 2 * k:2] = dx
+        obs[:, 4:4 + 2 * k:2] = dy
+        dx, dy, order = self._nearest(self.cx, self.cy, self.calive, sub_y)
+        start = 3 + 2 * k
+        obs[:, start::3] = dx
+        obs[:, start + 1::3] = dy
+        value = np.take_along_axis(self.collectibles['value'], order, axis=1)
+        # dx is 1 exactly where there was nothing to report
+        obs[:, start + 2::3] = np.where(dx < 1.0, value / self.collectible_value.max(), 0.0)
+        return obs
+
+    # ---------------- Internals ---------------- #
+
+    def _spawn(self, spawn, types, columns, boxes, values=None):
+        alive = columns['alive']
+        slot = np.argmin(alive, axis=1)  # first free slot (0 if there is none)
+        rows = np.flatnonzero(spawn & ~alive[np.arange(self.num_envs), slot])
+        slot = slot[rows]
+        y = self.rng.integers(50, self.height - 50, len(rows), endpoint=True)
+        box = boxes[types[rows]]
+        columns['x'][rows, slot] = self.width
+        columns['y'][rows, slot] = y
+        columns['type'][rows, slot] = types[rows]
+        columns['box_dx'][rows, slot] = box[:, 0]
+        columns['box_w'][rows, slot] = box[:, 2]
+        columns['top'][rows, slot] = top = np.trunc(y + box[:, 1])
+        columns['bottom'][rows, slot] = top + box[:, 3]
+        if values is not None:
+            columns['value'][rows, slot] = values[types[rows]]
+        alive[rows, slot] = True
+
+    def _overlap(self, columns, sub_top):
+        left = np.trunc(columns['x'] + columns['box_dx'])
+        return ((left < self.sub_x + self.sub_w) & (left + columns['box_w'] > self.sub_x)
+                & (columns['top'] < sub_top + self.sub_h) & (columns['bottom'] > sub_top))
+
+    def _nearest(self, xs, ys, alive, sub_y):
+        """dx, dy and slot order of the nearest entities at or past the submarine's x"""
+        ahead = alive & (xs >= self.sub_x)
+        key = np.where(ahead, xs, np.inf)
+        order = np.argsort(key, axis=1)[:, :self.nearest]
+        found = np.take_along_axis(ahead, order, axis=1)
+        dx = np.where(found, (np.take_along_axis(xs, order, axis=1) - self.sub_x) / self.width, 1.0)
+        dy = np.where(found, (np.take_along_axis(ys, order, axis=1) - sub_y) / self.height, 0.0)
+        return dx, dy, order
+
+    def _reset_games(self, mask):
+        self.y[mask] = self.height // 2
+        self.velocity[mask] = 0
+        self.time[mask] = 0
+        self.score[mask] = 0
+        self.calive[mask] = False
+        self.oalive[mask] = False
+
+
+def main(argv):
+    num_envs = int(argv[0]) if argv else 1024
+    env = VectorEnv(num_envs, seed=0)
+    env.reset()
+    rng = np.random.default_rng(1)
+    steps = 600
+    actions = rng.random((steps, num_envs)) < 0.06
+    finished = 0
+    start = time.perf_counter()
+    for jumps in actions:
+        _, _, dones, _ = env.step(jumps)
+        finished += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    print(f"{num_envs} games x {steps} steps in {elapsed:.2f}s: "
+          f"{num_envs * steps / elapsed:,.0f} game-steps/s ({finished} games ended)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))